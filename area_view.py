@@ -1,9 +1,8 @@
-import copy
+from bisect import bisect_left
 
 from helpers import safe_element_list_get, safe_element_dict_get, DefaultAppValues
 from labels import Labels
-from logger import logger
-from style import Style
+from section_overrides import SectionOverrides
 
 
 class AreaView:
@@ -23,11 +22,10 @@ class AreaView:
                  sections,
                  style,
                  area_config=[],
-                 labels=None,
-                 is_subarea = False):
+                 labels=None):
         self.sections = sections
         self.processed_section_views = []
-        self.is_subarea = is_subarea
+        self._subarea_end_addresses = None
         self.area = area_config
         self.style = style
         self.start_address = safe_element_dict_get(self.area, 'start', self.sections.lowest_memory)
@@ -48,8 +46,7 @@ class AreaView:
         self.title = safe_element_dict_get(self.area, 'title', DefaultAppValues.TITLE)
         self.address_to_pxl = (self.end_address - self.start_address) / self.size_y
 
-        if not self.is_subarea:
-            self._process()
+        self._process()
 
     def get_split_area_views(self):
         """
@@ -58,6 +55,24 @@ class AreaView:
         """
         return self.processed_section_views
 
+    def find_split_area_view(self, address):
+        """
+        Find the split area view where the provided address is, with a binary search over the
+        end addresses of the split area views, which are consecutive and sorted by address
+
+        :param address: Address to look for
+        :return: First split area view containing the address. If not found, this area view
+        """
+        if self._subarea_end_addresses is None:
+            self._subarea_end_addresses = [subarea.end_address
+                                           for subarea in self.processed_section_views]
+
+        index = bisect_left(self._subarea_end_addresses, address)
+        if index < len(self.processed_section_views) and \
+                self.processed_section_views[index].start_address <= address:
+            return self.processed_section_views[index]
+        return self
+
     def to_pixels(self, value) -> float:
         """
         Convert a given address to pixels in an absolute manner,
@@ -91,36 +106,11 @@ class AreaView:
         configuration files
         """
 
+        overrides = SectionOverrides(safe_element_dict_get(self.area, 'sections', []))
         for section in self.sections.get_sections():
+            overrides.apply(section, self.style)
 
-            section_style = copy.deepcopy(self.style)
-            section.style = section_style
-
-            inner_sections = safe_element_dict_get(self.area, 'sections', [])
-
-            if inner_sections is None:
-                logger.warning(
-                    "'sections' property is declared but is empty. Field has been ignored")
-                inner_sections = []
-
-            for element in inner_sections:
-
-                section_names = safe_element_dict_get(element, 'names', [])
-
-                if section_names is None:
-                    logger.warning(
-                        "'sections' property is declared but is empty. Field has been ignored")
-                    section_names = []
-
-                for item in section_names:
-                    if item == section.id:
-                        # OVERWRITE style, address, size and type if needed
-                        section_style.override_properties_from(Style(style=element.get('style')))
-                        section.address = element.get('address', section.address)
-                        section.type = element.get('type', section.type)
-                        section.size = element.get('size', section.size)
-                        # As flags can be defined previously at map file, APPEND whatever is new
-                        section.flags += element.get('flags', section.flags)
+        self.sections.invalidate()
 
     def _process(self):
         def recalculate_subarea_size_y(start_mem_addr, end_mem_addr):
@@ -139,47 +129,22 @@ class AreaView:
             return (self.to_pixels(end_mem_addr - start_mem_addr) / total_non_breaks_size_y_px) * \
                    (total_non_breaks_size_y_px + expandable_size_px)
 
-        def area_config_clone(configuration, pos_y_px, size_y_px, start_mem_addr, end_mem_addr):
-            """
-            Clones an area configuration and changes position and size
-
-            :param configuration: Area configuration to clone
-            :param pos_y_px: Position in pixels for the new cloned configuration
-            :param size_y_px: Size y in pixels of the new cloned configuration
-            :param start_mem_addr: minimum memory address that the new sub-area must show
-            :param end_mem_addr: maximum memory address that the new sub-area must show
-            :return: A new area configuration with the provided configuration and provided parameters
-            """
-            new_configuration = copy.deepcopy(configuration)
-            new_configuration['size'] = [DefaultAppValues.SIZE_X, DefaultAppValues.SIZE_Y]
-            if new_configuration.get('pos') is None:
-                new_configuration['pos'] = [DefaultAppValues.POSITION_X, DefaultAppValues.POSITION_Y]
-            new_configuration['size'][1] = size_y_px
-            new_configuration['pos'][1] = pos_y_px - size_y_px
-            new_configuration['start'] = start_mem_addr
-            new_configuration['end'] = end_mem_addr
-            return new_configuration
-
         self._overwrite_sections_info()
 
         if len(self.sections.get_sections()) == 0:
             print("Filtered sections produced no results")
             return
 
-        split_section_groups = self.sections.split_sections_around_breaks()
-
         breaks_count = len(self.sections.filter_breaks().get_sections())
         area_has_breaks = breaks_count >= 1
         breaks_section_size_y_px = self.style.break_size if self.style is not None else 20
 
         if not area_has_breaks:
-            if len(self.sections.get_sections()) == 0:
-                logger.error(f"An area view without sections made its through the process. "
-                             f"This shouldn't be happening")
-                exit(-1)
             self.processed_section_views.append(self)
             return
 
+        split_section_groups = self.sections.split_sections_around_breaks()
+
         total_breaks_size_y_px = self._get_break_total_size_before_transform_px()
         total_non_breaks_size_y_px = self._get_non_breaks_total_size_px(total_breaks_size_y_px)
 
@@ -187,46 +152,36 @@ class AreaView:
         expandable_size_px = total_breaks_size_y_px - (breaks_section_size_y_px * breaks_count)
 
         last_area_pos = self.pos_y + self.size_y
+        last_index = len(split_section_groups) - 1
 
+        # Single sweep over the groups, which are sorted by address: each sub-area spans from the
+        # end of the memory shown by the previous group to the start of the next one
         for i, section_group in enumerate(split_section_groups):
+            is_break_group = section_group.is_break_section_group()
 
-            # TODO: ideally, instead of doing this, we should have previously obtained an array
-            #       of sub-areas with already start and end values set. That method should live
-            #       at area class and not at sections. That is, kill the
-            #       `split_sections_around_breaks` method
-            if section_group is split_section_groups[0]:
+            if i == 0:
                 start_addr = self.start_address
                 end_addr = split_section_groups[1].lowest_memory
-            elif section_group is split_section_groups[-1]:
-                end_addr = self.end_address if self.end_address > section_group.highest_memory else section_group.highest_memory
+            elif i == last_index:
+                end_addr = max(self.end_address, section_group.highest_memory)
                 start_addr = split_section_groups[-2].highest_memory
-            elif section_group.is_break_section_group():
+            elif is_break_group:
                 start_addr = section_group.lowest_memory
                 end_addr = section_group.highest_memory
             else:
                 start_addr = split_section_groups[i - 1].highest_memory
                 end_addr = split_section_groups[i + 1].lowest_memory
 
-            # Assign new calculated size y
-            corrected_size_y_px = breaks_section_size_y_px \
-                if section_group.is_break_section_group() \
+            size_y_px = breaks_section_size_y_px if is_break_group \
                 else recalculate_subarea_size_y(start_addr, end_addr)
+            last_area_pos -= size_y_px
 
-            subconfig = area_config_clone(self.area,
-                                          last_area_pos,
-                                          corrected_size_y_px,
-                                          start_addr,
-                                          end_addr)
-
-            last_area_pos = subconfig['pos'][1]
-
-            self.processed_section_views.append(AreaView(
-                sections=section_group,
-                area_config=subconfig,
-                labels=self.labels,
-                style=self.style,
-                is_subarea=True)
-            )
+            self.processed_section_views.append(SubArea(sections=section_group,
+                                                        area_view=self,
+                                                        pos_y=last_area_pos,
+                                                        size_y=size_y_px,
+                                                        start_address=start_addr,
+                                                        end_address=end_addr))
 
     def _get_break_total_size_before_transform_px(self):
         """
@@ -255,3 +210,39 @@ class AreaView:
         highest_mem = self.end_address if self.end_address > self.sections.highest_memory else self.sections.highest_memory
         lowest_mem = self.start_address if self.start_address < self.sections.lowest_memory else self.sections.lowest_memory
         return self.to_pixels(highest_mem - lowest_mem) - breaks_size_y_sum_px
+
+
+class SubArea:
+    """
+    Span of an area view between, or at, its break sections
+
+    Sub-areas are lightweight: they share the style and labels of their area view, and only hold
+    the sections they show, their position and size, and the address range they span
+    """
+    __slots__ = ('sections', 'style', 'labels', 'pos_x', 'pos_y', 'size_x', 'size_y',
+                 'start_address', 'end_address', 'address_to_pxl')
+
+    def __init__(self, sections, area_view, pos_y, size_y, start_address, end_address):
+        self.sections = sections
+        self.style = area_view.style
+        self.labels = area_view.labels
+        self.pos_x = area_view.pos_x
+        self.pos_y = pos_y
+        self.size_x = area_view.size_x
+        self.size_y = size_y
+        self.start_address = start_address
+        self.end_address = end_address
+        self.address_to_pxl = (end_address - start_address) / size_y
+
+    def to_pixels(self, value) -> float:
+        """
+        Convert a given address to pixels in an absolute manner (see `AreaView.to_pixels`)
+        """
+        return value / self.address_to_pxl
+
+    def to_pixels_relative(self, value) -> float:
+        """
+        Convert a given address to pixels relative to the start address of the sub-area (see
+        `AreaView.to_pixels_relative`)
+        """
+        return self.size_y - ((value - self.start_address) / self.address_to_pxl)
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Measure the time needed to diff two big maps whose sections share their parent and id, as the
+input sections of maps built without `-ffunction-sections` do, where every object file
+contributes a `.text` section to the `.text` output section.
+
+The new map has one more object file, in the middle of the old ones. Its sections must be
+reported as added, and the sections after them as moved by its size, instead of being paired
+with the sections that moved to their addresses. Exits with an error otherwise
+
+Usage: ./benchmarks/bench_diff.py [object_count]
+"""
+import random
+import sys
+import time
+
+import synthetic_map  # noqa: F401, adds the repository root to the import path
+from map_diff import ADDED, MOVED, UNCHANGED, diff_sections
+from section import Section
+
+OUTPUT_SECTIONS = ('.text', '.rodata', '.data', '.bss')
+INSERTED_SIZE = 0x100
+
+
+def make_sections(object_count, inserted_index=None, seed=0):
+    """
+    Get the input sections of a map with `object_count` object files, each contributing one
+    section to every output section. If `inserted_index` is given, an additional object file is
+    placed before the object file of that index, moving the ones after it
+    """
+    generator = random.Random(seed)
+    sizes = [generator.randrange(4, 0x400, 4) for _ in range(object_count)]
+    if inserted_index is not None:
+        sizes.insert(inserted_index, INSERTED_SIZE)
+
+    sections = []
+    for index, parent in enumerate(OUTPUT_SECTIONS):
+        address = 0x08000000 + (index << 28)
+        for size in sizes:
+            sections.append(Section(size=size, address=address, id=parent, _type='section',
+                                    parent=parent))
+            address += size
+    return sections
+
+
+def main():
+    object_count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000 // len(OUTPUT_SECTIONS)
+    old_sections = make_sections(object_count)
+    new_sections = make_sections(object_count, inserted_index=object_count // 2)
+
+    start = time.perf_counter()
+    changes = diff_sections(old_sections, new_sections)
+    elapsed = time.perf_counter() - start
+
+    changed = [change for change in changes if change.status != UNCHANGED]
+    print(f"diff: {len(changes)} sections, {len(changed)} changed in {elapsed:6.3f} s")
+
+    added = [change for change in changed if change.status == ADDED]
+    wrong = [change for change in changed if change.status != ADDED and
+             (change.status != MOVED or change.new.address - change.old.address != INSERTED_SIZE)]
+    if len(added) != len(OUTPUT_SECTIONS) or wrong:
+        print(f"Expected {len(OUTPUT_SECTIONS)} added sections and the sections after them moved "
+              f"by {INSERTED_SIZE:#x} bytes, got {len(added)} added and {len(wrong)} wrongly "
+              f"paired sections")
+        sys.exit(-1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Measure the throughput of `GNULinkerMapParser`, in sections per second, on a synthetic map file
+
+Usage: ./benchmarks/bench_parser.py [section_count] [jobs] [--mmap]
+"""
+import os
+import resource
+import sys
+import tempfile
+import time
+
+from synthetic_map import write_synthetic_map
+from gnu_linker_map_parser import GNULinkerMapParser
+
+
+def main():
+    section_count = int(sys.argv[1]) if len(sys.argv) > 1 else 400000
+    jobs = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+    use_mmap = '--mmap' in sys.argv
+
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, 'synthetic.map')
+        write_synthetic_map(filename, section_count)
+        file_size_mb = os.path.getsize(filename) / 1e6
+
+        start = time.perf_counter()
+        parsed = sum(1 for _ in GNULinkerMapParser(filename, jobs=jobs, use_mmap=use_mmap).iter_sections())
+        elapsed = time.perf_counter() - start
+
+    print(f"{file_size_mb:.1f} MB map, {parsed} sections parsed by {jobs} job(s) in "
+          f"{elapsed:.2f} s: {parsed / elapsed:,.0f} sections/s "
+          f"({file_size_mb / elapsed:.1f} MB/s), peak RSS "
+          f"{resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""
+Measure the memory taken by `Section` objects, in bytes per section, creating one million of them
+the way the map parser does
+
+Usage: ./benchmarks/bench_section_memory.py [section_count]
+"""
+import sys
+import tracemalloc
+
+import synthetic_map  # noqa: F401, adds the repository root to the import path
+from section import Section
+
+
+def main():
+    section_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    parents = ['.text', '.rodata', '.data', '.bss']
+
+    tracemalloc.start()
+    sections = [Section(size=0x40,
+                        address=0x08000000 + 0x40 * index,
+                        id=f'function_{index % 1000}',
+                        parent=parents[index % len(parents)],
+                        _type='section')
+                for index in range(section_count)]
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"{len(sections)} sections: {current / 1e6:.1f} MB, "
+          f"{current / len(sections):.0f} bytes per section")
+
+
+if __name__ == '__main__':
+    main()
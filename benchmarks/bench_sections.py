@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Compare the time needed to filter a big list of sections and to lay them out in pixels, between
+the python `Sections` backend and the NumPy backed one (`--backend numpy`). Building the area
+views themselves (style overrides, break splitting) is left out, as it does not depend on the
+backend
+
+Usage: ./benchmarks/bench_sections.py [section_count]
+"""
+import random
+import sys
+import time
+
+import synthetic_map  # noqa: F401, adds the repository root to the import path
+from area_view import AreaView
+from numpy_sections import NumpySections
+from section import Section
+from sections import Sections
+from style import Style
+
+
+def make_sections(section_count, seed=0):
+    generator = random.Random(seed)
+    sections = []
+    address = 0x08000000
+    for index in range(section_count):
+        size = generator.randrange(4, 0x400, 4)
+        sections.append(Section(size=size, address=address, id=f'symbol_{index}',
+                                _type='section', parent='.text', flags=[]))
+        address += size
+    return sections
+
+
+def measure(name, sections, sections_class, memory_range, section_size):
+    start = time.perf_counter()
+    filtered = (sections_class(sections)
+                .filter_address_min(memory_range[0])
+                .filter_address_max(memory_range[1])
+                .filter_size_min(section_size[0])
+                .filter_size_max(section_size[1]))
+    count = len(filtered.get_sections())
+    _ = filtered.lowest_memory, filtered.highest_memory, filtered.highest_address
+    filter_elapsed = time.perf_counter() - start
+
+    area_view = AreaView(sections=sections_class(sections), style=Style().get_default())
+    start = time.perf_counter()
+    area_view.sections.layout(area_view)
+    layout_elapsed = time.perf_counter() - start
+
+    print(f"{name:<8} filter: {count:>8} of {len(sections)} sections in {filter_elapsed:6.3f} s, "
+          f"layout: {layout_elapsed:6.3f} s")
+
+
+def main():
+    section_count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    sections = make_sections(section_count)
+    end = sections[-1].address + sections[-1].size
+
+    # Zoom on the first half of the memory, keeping small sections only
+    memory_range = (0x08000000, 0x08000000 + (end - 0x08000000) // 2)
+    section_size = (0, 0x200)
+
+    measure('python', sections, Sections, memory_range, section_size)
+    measure('numpy', sections, NumpySections, memory_range, section_size)
+
+
+if __name__ == '__main__':
+    main()
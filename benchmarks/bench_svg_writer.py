@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Compare the time and peak memory needed to render a synthetic map file to SVG, between the
+svgwrite based writer and the streaming one (`--writer stream`)
+
+The map is rendered the way the examples are, with an area for the flash and another one for the
+RAM
+
+Usage: ./benchmarks/bench_svg_writer.py [section_count]
+"""
+import filecmp
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from svgwrite import Drawing
+
+from synthetic_map import write_synthetic_map
+from gnu_linker_map_parser import GNULinkerMapParser
+from linkerscope import get_area_views
+from map_render import MapRender
+from style import Style
+from svg_stream import StreamingDrawing
+
+CONFIGURATION = {'areas': [{'area': {'title': 'Flash', 'pos': [50, 50], 'size': [200, 900],
+                                     'range': [0x08000000, 0x09000000]}},
+                           {'area': {'title': 'RAM', 'pos': [400, 50], 'size': [200, 900],
+                                     'range': [0x20000000, 0x21000000]}}]}
+
+
+def render(sections, drawing_class, filename):
+    MapRender(area_view=get_area_views(sections, Style.get_default(), CONFIGURATION),
+              links=None,
+              style=Style.get_default(),
+              file=filename,
+              size=(700, 1000),
+              drawing_class=drawing_class).draw()
+
+
+def measure(name, sections, drawing_class, filename):
+    start = time.perf_counter()
+    render(sections, drawing_class, filename)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    render(sections, drawing_class, filename)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"{name:<9} {elapsed:6.2f} s, peak memory {peak / 1e6:7.1f} MB, "
+          f"{os.path.getsize(filename) / 1e6:.1f} MB written")
+
+
+def main():
+    section_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+
+    with tempfile.TemporaryDirectory() as directory:
+        map_filename = os.path.join(directory, 'synthetic.map')
+        # Only half of the input sections of synthetic maps are picked up by the parser
+        write_synthetic_map(map_filename, 2 * section_count)
+        sections = list(GNULinkerMapParser(map_filename).iter_sections())
+
+        svgwrite_filename = os.path.join(directory, 'svgwrite.svg')
+        stream_filename = os.path.join(directory, 'stream.svg')
+        measure('svgwrite', sections, Drawing, svgwrite_filename)
+        measure('stream', sections, StreamingDrawing, stream_filename)
+
+        print(f"{len(sections)} sections, outputs are "
+              f"{'identical' if filecmp.cmp(svgwrite_filename, stream_filename) else 'DIFFERENT'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Compare the time and peak Python memory needed to load a yaml map file, between loading the
+whole document with `yaml.safe_load` (previous implementation) and streaming its elements with
+`YamlMapReader`, the one used by `MapFileLoader`
+
+Usage: ./benchmarks/bench_yaml_loader.py [section_count]
+"""
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import yaml
+
+from synthetic_map import write_synthetic_yaml_map
+from map_file_loader import MapFileLoader
+from yaml_map_reader import Loader
+
+
+def load_whole_document(filename, loader):
+    with open(filename, 'r', encoding='utf-8') as file:
+        document = yaml.load(file, Loader=loader)
+    return [MapFileLoader.section_from_element(element) for element in document['map']]
+
+
+def measure(name, function, *args):
+    # Time and memory are measured in separate runs, as tracing allocations slows down the load
+    start = time.perf_counter()
+    sections = function(*args)
+    elapsed = time.perf_counter() - start
+    del sections
+
+    tracemalloc.start()
+    sections = function(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name:<36} {len(sections):>8} sections {elapsed:8.2f} s {peak / 1e6:8.1f} MB peak")
+
+
+def main():
+    section_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, 'synthetic.yaml')
+        write_synthetic_yaml_map(filename, section_count)
+
+        measure('yaml.safe_load (pure Python)', load_whole_document, filename, yaml.SafeLoader)
+        if Loader is not yaml.SafeLoader:
+            measure('yaml.load (CSafeLoader)', load_whole_document, filename, Loader)
+        measure(f'YamlMapReader ({Loader.__name__})', MapFileLoader.parse_yaml, filename)
+
+
+if __name__ == '__main__':
+    main()
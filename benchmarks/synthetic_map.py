@@ -0,0 +1,82 @@
+"""
+Generators of synthetic GNU linker map files, used by the benchmarks to exercise LinkerScope on
+inputs much larger than the ones available at the examples folder
+"""
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+HEADER = """Archive member included to satisfy reference by file (symbol)
+
+libc.a(lib_a-memcpy.o)        build/main.o (memcpy)
+
+Memory Configuration
+
+Name             Origin             Length             Attributes
+FLASH            0x0000000008000000 0x0000000000100000 xr
+RAM              0x0000000020000000 0x0000000000020000 xrw
+*default*        0x0000000000000000 0xffffffffffffffff
+
+Linker script and memory map
+
+"""
+
+OUTPUT_SECTIONS = [('.text', 0x08000000), ('.rodata', 0x08800000),
+                   ('.data', 0x20000000), ('.bss', 0x20800000)]
+
+
+def write_synthetic_map(filename, section_count, seed=0):
+    """
+    Write a GNU linker like map file with approximately `section_count` input sections
+
+    Input sections are spread among a few output sections. Half of them have names long enough
+    to be wrapped to the next line (the ones LinkerScope picks up), the other half fit in a single
+    line. Each input section contributes one symbol line, as the linker does for global symbols
+
+    :param filename: Path of the map file to generate
+    :param section_count: Number of input sections to generate
+    :param seed: Seed for the random sizes, so that generated files are reproducible
+    """
+    rng = random.Random(seed)
+    per_output = max(1, section_count // len(OUTPUT_SECTIONS))
+
+    with open(filename, 'w', encoding='utf8') as file:
+        file.write(HEADER)
+        for output_name, base_address in OUTPUT_SECTIONS:
+            sizes = [rng.randrange(4, 0x400, 4) for _ in range(per_output)]
+            file.write(f'{output_name:<15} 0x{base_address:016x} {hex(sum(sizes)):>10}\n')
+            file.write(f' *({output_name} {output_name}.*)\n')
+            address = base_address
+            for i, size in enumerate(sizes):
+                obj = f'build/module_{i % 97}.o'
+                if i % 2:
+                    file.write(f' {output_name}.function_{i}\n')
+                    file.write(f'                0x{address:016x} {hex(size):>10} {obj}\n')
+                else:
+                    file.write(f' {output_name:<14} 0x{address:016x} {hex(size):>10} {obj}\n')
+                file.write(f'                0x{address:016x}                symbol_{i}\n')
+                address += size
+            file.write('\n')
+        file.write('OUTPUT(build/firmware.elf elf32-littlearm)\n')
+
+
+def write_synthetic_yaml_map(filename, section_count):
+    """
+    Write a yaml map file with `section_count` sections, as a user would hand-write it
+
+    :param filename: Path of the yaml map file to generate
+    :param section_count: Number of sections to generate
+    """
+    address = 0x08000000
+    with open(filename, 'w', encoding='utf8') as file:
+        file.write('map:\n')
+        for i in range(section_count):
+            size = 0x10 + (i % 61) * 4
+            file.write(f'- id: function_{i}\n'
+                       f'  address: 0x{address:08X}\n'
+                       f'  size:    0x{size:08X}\n'
+                       f'  parent:  .text\n'
+                       f'  type:    section\n')
+            address += size
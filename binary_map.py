@@ -0,0 +1,196 @@
+import mmap
+import struct
+import sys
+from array import array
+
+from section import Section
+
+
+class BinaryMap:
+    """
+    Compact binary columnar map file
+
+    The file starts with a fixed size header, followed by one packed column per section field and
+    a string table shared by every text field:
+
+    - header: magic, format version, section count, string count, string blob size
+    - addresses and sizes: one unsigned 64-bit integer per section each
+    - ids, names, parents, types and flags: one unsigned 32-bit index per section each, pointing
+      at the string table (`NO_STRING` stands for a missing value)
+    - string table: string count + 1 unsigned 32-bit offsets, followed by the UTF-8 blob
+
+    All integers are little endian. Files are loaded through `mmap`, so the columns are used
+    in place instead of being parsed record by record
+    """
+    MAGIC = b'LSCOPE\x00\x01'
+    VERSION = 1
+    EXTENSION = '.lsmap'
+    HEADER = struct.Struct('<8sIIII')
+    NO_STRING = 0xFFFFFFFF
+    FLAGS_SEPARATOR = ','
+
+    INTEGER_COLUMNS = ('addresses', 'sizes')
+    STRING_COLUMNS = ('ids', 'names', 'parents', 'types', 'flags')
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.columns = {}
+        self.strings = []
+
+        with open(filename, 'rb') as file:
+            self._buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        self._view = None
+        try:
+            if len(self._buffer) < self.HEADER.size:
+                raise ValueError(f"{filename} is truncated")
+            magic, version, self.count, string_count, blob_size = \
+                self.HEADER.unpack_from(self._buffer, 0)
+            if magic != self.MAGIC:
+                raise ValueError(f"{filename} is not a binary map file")
+            if version != self.VERSION:
+                raise ValueError(f"{filename} has unsupported binary map version {version}")
+
+            blob_offset = self.HEADER.size + 8 * self.count * len(self.INTEGER_COLUMNS) + \
+                4 * self.count * len(self.STRING_COLUMNS) + 4 * (string_count + 1)
+            if blob_offset + blob_size > len(self._buffer):
+                raise ValueError(f"{filename} is truncated")
+
+            view = self._view = memoryview(self._buffer)
+            offset = self.HEADER.size
+            for name in self.INTEGER_COLUMNS:
+                self.columns[name] = self._get_column(view, offset, 'Q')
+                offset += 8 * self.count
+            for name in self.STRING_COLUMNS:
+                self.columns[name] = self._get_column(view, offset, 'I')
+                offset += 4 * self.count
+
+            offsets = self._get_column(view, offset, 'I', string_count + 1)
+            blob = view[blob_offset:]
+            try:
+                if offsets[-1] > len(blob):
+                    raise ValueError(f"{filename} is truncated")
+                self.strings = [str(blob[offsets[i]:offsets[i + 1]], 'utf8')
+                                for i in range(string_count)]
+            finally:
+                self._release(offsets, blob)
+        except Exception:
+            # Views of the memory map must be released before closing it
+            self.close()
+            raise
+
+    def __len__(self):
+        return self.count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def close(self):
+        self._release(*self.columns.values(), self._view)
+        self.columns = {}
+        self._buffer.close()
+
+    @staticmethod
+    def _release(*views):
+        for view in views:
+            if isinstance(view, memoryview):
+                view.release()
+
+    def _get_column(self, view, offset, typecode, count=None):
+        count = self.count if count is None else count
+        size = array(typecode).itemsize * count
+        column = view[offset:offset + size]
+        if sys.byteorder == 'little':
+            return column.cast(typecode)
+        swapped = array(typecode, column.tobytes())
+        swapped.byteswap()
+        return swapped
+
+    def get_sections(self):
+        """
+        Build the sections stored in the file
+        :return: List of sections
+        """
+        columns = self.columns
+        strings = self.strings + [None]
+        no_string = self.NO_STRING
+        string_count = len(self.strings)
+
+        def _get(index):
+            return strings[string_count if index == no_string else index]
+
+        return [Section(address=address,
+                        size=size,
+                        id=_get(_id),
+                        name=_get(name),
+                        parent=_get(parent),
+                        _type=_get(_type),
+                        flags=_get(flags))
+                for address, size, _id, name, parent, _type, flags in zip(columns['addresses'],
+                                                                          columns['sizes'],
+                                                                          columns['ids'],
+                                                                          columns['names'],
+                                                                          columns['parents'],
+                                                                          columns['types'],
+                                                                          columns['flags'])]
+
+    @staticmethod
+    def is_binary_map(filename):
+        """
+        Check whether a file is a binary map file by looking at its magic bytes
+        :param filename: Path of the file to check
+        :return: True if the file is a binary map file
+        """
+        with open(filename, 'rb') as file:
+            return file.read(len(BinaryMap.MAGIC)) == BinaryMap.MAGIC
+
+    @staticmethod
+    def write(sections, filename):
+        """
+        Write a list of sections as a binary map file
+
+        :param sections: List of sections to write
+        :param filename: Path of the binary map file to write
+        """
+        string_indexes = {}
+        string_blobs = []
+
+        def _intern(string):
+            if string is None:
+                return BinaryMap.NO_STRING
+            index = string_indexes.get(string)
+            if index is None:
+                index = string_indexes[string] = len(string_blobs)
+                string_blobs.append(string.encode('utf8'))
+            return index
+
+        columns = [array('Q', (section.address for section in sections)),
+                   array('Q', (section.size for section in sections)),
+                   array('I', (_intern(section.id) for section in sections)),
+                   array('I', (_intern(section.name) for section in sections)),
+                   array('I', (_intern(section.parent) for section in sections)),
+                   array('I', (_intern(section.type) for section in sections)),
+                   array('I', (_intern(BinaryMap.FLAGS_SEPARATOR.join(section.flags))
+                               for section in sections))]
+
+        offsets = array('I', [0])
+        for blob in string_blobs:
+            offsets.append(offsets[-1] + len(blob))
+        columns.append(offsets)
+
+        if sys.byteorder != 'little':
+            for column in columns:
+                column.byteswap()
+
+        with open(filename, 'wb') as file:
+            file.write(BinaryMap.HEADER.pack(BinaryMap.MAGIC,
+                                             BinaryMap.VERSION,
+                                             len(sections),
+                                             len(string_blobs),
+                                             offsets[-1]))
+            for column in columns:
+                column.tofile(file)
+            file.write(b''.join(string_blobs))
@@ -1,81 +1,428 @@
+import contextlib
+import io
+import mmap
+import os
 import re
+from concurrent.futures import ProcessPoolExecutor
+
 import yaml
 
+from helpers import pairwise
 from section import Section
+from symbol_table import SymbolTable
 
 
 class GNULinkerMapParser:
     """
     Parse a GNU linker map file and convert it to a yaml file for further processing
+
+    The map file is read in a single pass. Every line is checked once against a set of patterns
+    compiled at class level, and sections are yielded as soon as they are found, so the whole
+    file never needs to be held in memory
     """
-    def __init__(self, input_filename, output_filename):
+    # Must be increased whenever a change in the parser modifies its output, so that map files
+    # parsed by a previous version are not served from the parse cache
+    VERSION = 2
+
+    # Files smaller than this are always parsed serially, as starting the workers costs more
+    PARALLEL_MIN_SIZE = 1 << 20
+
+    # Size of the windows memory mapped files are scanned in (see `_scan_windows`)
+    MMAP_WINDOW_SIZE = 16 << 20
+
+    # Number of chunks each job gets, so that jobs finishing early can take over pending chunks
+    CHUNKS_PER_JOB = 4
+
+    # Output section (area) declared in a single line, e.g. `.text  0x08000000  0x1234`
+    AREA_PATTERN = re.compile(
+        r'([.][a-z]{1,})[ ]{1,}(0x[a-fA-F0-9]{1,})[ ]{1,}(0x[a-fA-F0-9]{1,})\n')
+
+    # Input section whose name is too long to fit in the line, so that its address and size are
+    # wrapped to the next line. The header line holds the name...
+    SECTION_HEADER_PATTERN = re.compile(r'\s(.[^.]+).([^. \n]+)[\n\r]')
+
+    # ... and the line right after holds the address, size and contributing object
+    SECTION_DETAIL_PATTERN = re.compile(
+        r'\s+(0x[0-9a-fA-F]{16})\s+(0x[0-9a-fA-F]+)\s+[^\n]+[\n\r]{1}')
+
+    # Byte patterns equivalent to the ones above, run over a whole memory mapped file instead of
+    # line by line. Whitespace classes exclude the newline so that matches never span more lines
+    # than their line based counterparts. Detail lines are found first, as the newline ending the
+    # line right before them followed by a lookahead, so that the regex engine can skip quickly
+    # to candidate positions. Only then the header pattern is searched at the line before
+    AREA_BYTES_PATTERN = re.compile(
+        rb'([.][a-z]{1,})[ ]{1,}(0x[a-fA-F0-9]{1,})[ ]{1,}(0x[a-fA-F0-9]{1,})\r?\n')
+
+    SECTION_HEADER_BYTES_PATTERN = re.compile(rb'[^\S\n](.[^.\n]+).([^. \r\n]+)\r?\n')
+
+    SECTION_DETAIL_BYTES_PATTERN = re.compile(
+        rb'\n(?=[^\S\n]+(0x[0-9a-fA-F]{16})[^\S\n]+(0x[0-9a-fA-F]+)[^\S\n]+[^\n]+\n)')
+
+    # Patterns used by the symbol level ingest (see `iter_symbol_records`). An input section fits
+    # either in a single line, e.g. ` .text  0x08000000  0x5c build/main.o`, or is wrapped in a
+    # header line holding its name and a detail line holding its address, size and object
+    INPUT_SECTION_PATTERN = re.compile(
+        r' ([^\s*]\S*)[ \t]+(0x[0-9a-fA-F]+)[ \t]+(0x[0-9a-fA-F]+)[ \t]+(\S.*?)\s*$')
+    INPUT_SECTION_HEADER_PATTERN = re.compile(r' ([^\s*]\S*)\s*$')
+    INPUT_SECTION_DETAIL_PATTERN = re.compile(
+        r'\s+(0x[0-9a-fA-F]+)\s+(0x[0-9a-fA-F]+)\s+(\S.*?)\s*$')
+
+    # Symbol defined at an input section, e.g. `                0x08000000                main`.
+    # Linker script assignments such as `_etext = .` or `PROVIDE (end = .)` are left out
+    SYMBOL_PATTERN = re.compile(r'\s+(0x[0-9a-fA-F]+)\s+([^\s=()]+)\s*$')
+
+    def __init__(self, input_filename, output_filename=None, jobs=1, use_mmap=False,
+                 symbols=False):
         self.sections = []
         self.subsections = []
+        self.symbol_table = None
         self.input_filename = input_filename
         self.output_filename = output_filename
+        self.jobs = jobs
+        self.use_mmap = use_mmap
+        self.symbols = symbols
 
-    def parse(self):
+    def iter_sections(self):
+        """
+        Parse the map file, yielding sections (both areas and sections) as they are found
+
+        If more than one job was requested and the file is big enough, the file is parsed in
+        parallel (see `_iter_sections_parallel`). Otherwise, it is parsed line by line, or
+        scanned as a whole if memory mapping was requested (see `scan_records`)
+
+        :return: Generator of `Section` objects, in the order they appear in the map file
+        """
+        if self.jobs > 1 and os.path.getsize(self.input_filename) >= self.PARALLEL_MIN_SIZE:
+            yield from self._iter_sections_parallel()
+            return
+
+        if self.use_mmap:
+            with open(self.input_filename, 'rb') as file, _map_file(file) as buffer:
+                for record in self._scan_windows(buffer):
+                    yield self._make_section(record)
+            return
+
+        with open(self.input_filename, 'r', encoding='utf8') as file:
+            for record in self.iter_records(file):
+                yield self._make_section(record)
+
+    @classmethod
+    def iter_records(cls, lines):
+        """
+        Find the areas and sections at the given lines, as plain record tuples
+
+        The parser keeps a single line of state, the previous line. Each new line is first matched
+        against the (anchored, cheap) detail pattern, and only if it succeeds the previous line is
+        searched for a wrapped input section header. Areas are only reported once the following
+        line has been read, so the last line is never considered an area
+
+        :param lines: Iterable of lines, including their line terminator
+        :return: Generator of (type, parent, id, address, size) tuples, in the order they appear
+        """
+        area_pattern = cls.AREA_PATTERN
+        header_pattern = cls.SECTION_HEADER_PATTERN
+        detail_pattern = cls.SECTION_DETAIL_PATTERN
+
+        lines = iter(lines)
+        previous_line = next(lines, None)
+
+        for line in lines:
+            area = area_pattern.search(previous_line)
+            if area is not None:
+                yield 'area', None, area.group(1), int(area.group(2), 0), int(area.group(3), 0)
+
+            detail = detail_pattern.match(line)
+            if detail is not None:
+                header = header_pattern.search(previous_line)
+                if header is not None:
+                    yield 'section', header.group(1), header.group(2), \
+                        int(detail.group(1), 0), int(detail.group(2), 0)
+
+            previous_line = line
+
+    @classmethod
+    def scan_records(cls, buffer, start, end):
+        """
+        Find the areas and sections at the [start, end) range of a buffer holding map file lines,
+        without splitting it in lines
+
+        Compiled byte patterns are run over the buffer, and only the matched fields are decoded.
+        A match ending exactly at `end` is on the last line, which is never considered an area,
+        as for `iter_records`. Areas, which are few, are found first and merged back by position
+        with the sections, so that they come out in the order they appear
+
+        :param buffer: Bytes-like object, such as a memory mapped file
+        :param start: Offset of the first line to scan
+        :param end: Offset right after the last line to scan
+        :return: Generator of (type, parent, id, address, size) tuples, in the order they appear
+        """
+        areas = [(area.end(), ('area', None, area.group(1).decode('utf8'),
+                               int(area.group(2), 0), int(area.group(3), 0)))
+                 for area in cls.AREA_BYTES_PATTERN.finditer(buffer, start, end)
+                 if area.end() != end]
+        area_index = 0
+        header_pattern = cls.SECTION_HEADER_BYTES_PATTERN
+
+        for detail in cls.SECTION_DETAIL_BYTES_PATTERN.finditer(buffer, start, end):
+            previous_line_end = detail.end()
+            previous_line_start = max(start, buffer.rfind(b'\n', start, detail.start()) + 1)
+            header = header_pattern.search(buffer, previous_line_start, previous_line_end)
+            if header is None:
+                continue
+
+            while area_index < len(areas) and areas[area_index][0] <= previous_line_end:
+                yield areas[area_index][1]
+                area_index += 1
+
+            yield 'section', header.group(1).decode('utf8'), header.group(2).decode('utf8'), \
+                int(detail.group(1), 0), int(detail.group(2), 0)
+
+        for _, area in areas[area_index:]:
+            yield area
+
+    @classmethod
+    def _scan_windows(cls, buffer):
+        """
+        Scan a memory mapped map file in line-aligned windows
+
+        Each window is scanned together with the first line of the next one, the same way
+        parallel chunks are, and its pages are released once scanned, so that the resident
+        memory stays bounded by the window size instead of growing up to the file size
+
+        :param buffer: Memory mapped map file
+        :return: Generator of (type, parent, id, address, size) tuples, in the order they appear
+        """
+        size = len(buffer)
+        start = 0
+        while start < size:
+            end = buffer.find(b'\n', min(start + cls.MMAP_WINDOW_SIZE, size) - 1) + 1 or size
+            lookahead_end = buffer.find(b'\n', end) + 1 or size
+
+            yield from cls.scan_records(buffer, start, lookahead_end)
+
+            if hasattr(buffer, 'madvise') and hasattr(mmap, 'MADV_DONTNEED'):
+                page_end = end - end % mmap.PAGESIZE
+                if page_end > 0:
+                    buffer.madvise(mmap.MADV_DONTNEED, 0, page_end)
+            start = end
+
+    def _iter_sections_parallel(self):
+        """
+        Parse the map file splitting it in line-aligned chunks that are parsed by a pool of
+        processes
+
+        Every chunk is parsed together with the first line of the next chunk, so that sections
+        whose header and detail lines lie at both sides of a chunk boundary are found, and so
+        that the last line of the chunk is checked for areas, exactly as the serial parser does.
+        Chunk results are merged back in file order, so the result is identical to the serial one
+
+        :return: Generator of `Section` objects, in the order they appear in the map file
+        """
+        file_size = os.path.getsize(self.input_filename)
+        chunk_count = self.jobs * self.CHUNKS_PER_JOB
+        chunk_size = max(1, -(-file_size // chunk_count))
+        boundaries = [(start, min(start + chunk_size, file_size))
+                      for start in range(0, file_size, chunk_size)]
+
+        with ProcessPoolExecutor(max_workers=self.jobs) as executor:
+            for records in executor.map(_parse_chunk,
+                                        [self.input_filename] * len(boundaries),
+                                        [start for start, _ in boundaries],
+                                        [end for _, end in boundaries],
+                                        [self.use_mmap] * len(boundaries)):
+                for record in records:
+                    yield self._make_section(record)
+
+    @classmethod
+    def iter_symbol_records(cls, lines):
+        """
+        Find the symbols defined at the input sections of the given lines, as plain record tuples
+
+        The size of a symbol is not part of the map file, so it is taken as the distance to the
+        next symbol of the same input section with a higher address or, for the last one, to the
+        end of the input section. Symbols outside any input section are skipped
+
+        :param lines: Iterable of lines
+        :return: Generator of (name, address, size, input section, object) tuples
+        """
+        input_section_pattern = cls.INPUT_SECTION_PATTERN
+        header_pattern = cls.INPUT_SECTION_HEADER_PATTERN
+        detail_pattern = cls.INPUT_SECTION_DETAIL_PATTERN
+        symbol_pattern = cls.SYMBOL_PATTERN
+
+        input_section = None
+        header = None
+        symbols = []
+
+        for line in lines:
+            if line and not line[0].isspace() or line.startswith(' *'):
+                # Output sections, fill and input section pattern lines (` *fill*`, ` *(.text)`)
+                # and anything else starting at the first column close the current input section
+                yield from cls._size_symbols(input_section, symbols)
+                input_section, header, symbols = None, None, []
+                continue
+
+            if header is not None:
+                detail = detail_pattern.match(line)
+                if detail is not None:
+                    yield from cls._size_symbols(input_section, symbols)
+                    input_section = (header, int(detail.group(1), 0), int(detail.group(2), 0),
+                                     detail.group(3))
+                    header, symbols = None, []
+                    continue
+                header = None
+
+            match = symbol_pattern.match(line)
+            if match is not None:
+                if input_section is not None:
+                    symbols.append((match.group(2), int(match.group(1), 0)))
+                continue
+
+            match = input_section_pattern.match(line)
+            if match is not None:
+                yield from cls._size_symbols(input_section, symbols)
+                input_section = (match.group(1), int(match.group(2), 0), int(match.group(3), 0),
+                                 match.group(4))
+                symbols = []
+                continue
+
+            match = header_pattern.match(line)
+            if match is not None:
+                header = match.group(1)
+
+        yield from cls._size_symbols(input_section, symbols)
+
+    @staticmethod
+    def _size_symbols(input_section, symbols):
+        if input_section is None or not symbols:
+            return
+        section_name, section_address, section_size, _object = input_section
+        addresses = sorted({address for _, address in symbols})
+        next_addresses = dict(pairwise(addresses + [section_address + section_size]))
+        for name, address in sorted(symbols, key=lambda symbol: symbol[1]):
+            yield name, address, max(0, next_addresses[address] - address), section_name, _object
+
+    def parse_symbols(self):
+        """
+        Ingest the symbols of the map file
+        :return: `SymbolTable` holding every symbol found
+        """
+        table = SymbolTable()
         with open(self.input_filename, 'r', encoding='utf8') as file:
+            for record in self.iter_symbol_records(file):
+                table.append(*record)
+        return table
+
+    def parse(self):
+        """
+        Parse the map file and store its areas and sections at `sections` and `subsections`.
+        If symbols were requested, they are stored at `symbol_table`.
+        If an output filename was provided, write them as a yaml map file as well, symbols as
+        sections of type `symbol`
+        """
+        for section in self.iter_sections():
+            if section.type == 'area':
+                self.sections.append(section)
+            else:
+                self.subsections.append(section)
+
+        if self.symbols:
+            self.symbol_table = self.parse_symbols()
+
+        if self.output_filename is not None:
+            symbol_sections = [] if self.symbol_table is None \
+                else list(self.symbol_table.iter_sections())
+            self.write_yaml(self.sections + self.subsections + symbol_sections,
+                            self.output_filename)
 
-            file_iterator = iter(file)
-            prev_line = next(file_iterator)
-            for line in file_iterator:
-                self.process_areas(prev_line)
-                multiple_line = prev_line + line
-                self.process_sections(multiple_line)
-                prev_line = line
+    @staticmethod
+    def write_yaml(sections, output_filename):
+        """
+        Write a list of parsed sections as a yaml map file, areas first
 
+        :param sections: List of sections, as produced by the parser
+        :param output_filename: Path of the yaml map file to write
+        """
         my_dict = {'map': []}
-        for section in self.sections:
-            my_dict['map'].append({
-                'type': 'area',
-                'address': section.address,
-                'size': section.size,
-                'id': section.id,
-                'flags': section.flags
-            })
-
-        for subsection in self.subsections:
-            my_dict['map'].append({
-                'type': 'section',
-                'parent': subsection.parent,
-                'address': subsection.address,
-                'size': subsection.size,
-                'id': subsection.id,
-                'flags': subsection.flags
-            })
-
-        with open(self.output_filename, 'w', encoding='utf8') as file:
+        for section in sections:
+            if section.type == 'area':
+                my_dict['map'].append({
+                    'type': 'area',
+                    'address': section.address,
+                    'size': section.size,
+                    'id': section.id,
+                    'flags': section.flags
+                })
+
+        for subsection in sections:
+            if subsection.type != 'area':
+                my_dict['map'].append({
+                    'type': subsection.type,
+                    'parent': subsection.parent,
+                    'address': subsection.address,
+                    'size': subsection.size,
+                    'id': subsection.id,
+                    'flags': subsection.flags
+                })
+
+        with open(output_filename, 'w', encoding='utf8') as file:
             yaml_string = yaml.dump(my_dict)
             file.write(yaml_string)
 
-    def process_areas(self, line):
-        pattern = r'([.][a-z]{1,})[ ]{1,}(0x[a-fA-F0-9]{1,})[ ]{1,}(0x[a-fA-F0-9]{1,})\n'
-
-        p = re.compile(pattern)
-        result = p.search(line)
-
-        if result is not None:
-            self.sections.append(Section(parent=None,
-                                         id=result.group(1),
-                                         address=int(result.group(2), 0),
-                                         size=int(result.group(3), 0),
-                                         _type='area'
-                                         )
-                                 )
-
-    def process_sections(self, line):
-        pattern = r'\s(.[^.]+).([^. \n]+)[\n\r]\s+(0x[0-9a-fA-F]{16})\s+' \
-                  r'(0x[0-9a-fA-F]+)\s+[^\n]+[\n\r]{1}'
-
-        p = re.compile(pattern)
-        result = p.search(line)
-
-        if result is not None:
-            self.subsections.append(Section(parent=result.group(1),
-                                            id=result.group(2),
-                                            address=int(result.group(3), 0),
-                                            size=int(result.group(4), 0),
-                                            _type='section'
-                                            )
-                                    )
+    @staticmethod
+    def _make_section(record):
+        _type, parent, _id, address, size = record
+        return Section(parent=parent,
+                       id=_id,
+                       address=address,
+                       size=size,
+                       _type=_type
+                       )
+
+
+def _align_to_line(file, offset):
+    """
+    Get the offset of the first line starting at or after the given offset
+    """
+    if offset == 0:
+        return 0
+    file.seek(offset - 1)
+    file.readline()
+    return file.tell()
+
+
+def _map_file(file):
+    """
+    Memory map a whole file for reading. Empty files, which cannot be mapped, map to empty bytes
+    """
+    if os.fstat(file.fileno()).st_size == 0:
+        return contextlib.nullcontext(b'')
+    return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _parse_chunk(input_filename, start, end, use_mmap=False):
+    """
+    Parse the lines starting in the [start, end) byte range of a map file, plus the first line
+    starting after it. Start and end are moved forward to the next line start if needed
+
+    Runs at the worker processes of `GNULinkerMapParser._iter_sections_parallel`
+
+    :return: List of (type, parent, id, address, size) tuples found in the chunk
+    """
+    with open(input_filename, 'rb') as file:
+        start = _align_to_line(file, start)
+        end = _align_to_line(file, end)
+        if start >= end:
+            return []
+        file.seek(end)
+        lookahead_end = end + len(file.readline())
+
+        if use_mmap:
+            with _map_file(file) as buffer:
+                return list(GNULinkerMapParser.scan_records(buffer, start, lookahead_end))
+
+        file.seek(start)
+        data = file.read(lookahead_end - start)
+
+    lines = io.TextIOWrapper(io.BytesIO(data), encoding='utf8')
+    return list(GNULinkerMapParser.iter_records(lines))
@@ -32,4 +32,19 @@ def safe_element_dict_get(_dict: {}, key: str, default=None) -> int:
     :return: The expected element if exists, None if it doesn't
     """
 
-    return _dict[key] if _dict is not None and key in _dict else default
\ No newline at end of file
+    return _dict[key] if _dict is not None and key in _dict else default
+
+
+def pairwise(iterable):
+    """
+    Get the successive overlapping pairs of elements of an iterable, as `itertools.pairwise`
+    does, which is only available from Python 3.10
+
+    :param iterable: Iterable to get the pairs from
+    :return: Iterator of (previous, current) pairs
+    """
+    iterator = iter(iterable)
+    previous = next(iterator, None)
+    for current in iterator:
+        yield previous, current
+        previous = current
@@ -1,4 +1,3 @@
-import copy
 from dataclasses import dataclass
 from style import Style
 
@@ -25,8 +24,7 @@ class Labels:
         labels = []
 
         for element in labels_yaml:
-            style = copy.deepcopy(self.style)
-            label = Label(style.override_properties_from(Style(element.get('style'))))
+            label = Label(self.style.override_properties_from(Style(element.get('style'))))
 
             for key, value in element.items():
                 if key != 'style':
@@ -1,7 +1,11 @@
 #!/usr/bin/env python3
 
 import argparse
-import copy
+import functools
+import os
+import sys
+import time
+from collections import namedtuple
 
 import yaml
 
@@ -12,7 +16,71 @@ from logger import logger
 from map_render import MapRender
 from style import Style
 from map_file_loader import MapFileLoader
+from map_cache import MapCache
+from map_diff import diff_sections, format_report, get_diff_configurations, \
+    get_move_links, highlight_changes, MOVE_LINK_STYLE
+from section import SectionView
 from sections import Sections
+from svg_stream import CompactDrawing, StreamingDrawing
+
+try:
+    from numpy_sections import NumpySections
+except ImportError:
+    NumpySections = None
+
+try:
+    from raster_drawing import RasterDrawing
+except ImportError:
+    RasterDrawing = None
+
+# Seconds between two checks of the files watched by --watch
+WATCH_INTERVAL = 0.5
+
+# Area views, by configuration and style, drawn areas, by area view, and definitions, by key,
+# kept between the renders of --watch
+RenderCache = namedtuple('RenderCache', ['area_views', 'fragments', 'definitions'])
+
+
+def add_loading_arguments(parser):
+    """
+    Add the options selecting how map files are loaded and cached, and the sections backend, which
+    are shared with linkerscope_batch.py
+
+    :param parser: Argument parser to add the options to
+    """
+    parser.add_argument('--cache-dir',
+                        help='Directory where parsed .map files are cached. If not specified, '
+                             'will use $XDG_CACHE_HOME/linkerscope or ~/.cache/linkerscope',
+                        default=None
+                        )
+    parser.add_argument('--clear-cache',
+                        help='Removes all the cached parsed .map files before processing',
+                        action='store_true',
+                        default=False
+                        )
+    parser.add_argument('--no-cache',
+                        help='Neither reads nor writes the parsed .map files cache',
+                        action='store_true',
+                        default=False
+                        )
+    parser.add_argument('--mmap',
+                        help='Scans .map files as memory mapped files with byte patterns instead '
+                             'of reading them line by line',
+                        action='store_true',
+                        default=False
+                        )
+    parser.add_argument('--symbols',
+                        help='Loads the symbols of .map files as well, as sections of type symbol '
+                             'whose parent is their input section',
+                        action='store_true',
+                        default=False
+                        )
+    parser.add_argument('--backend',
+                        help='Sections backend: python (default) or numpy, which stores '
+                             'addresses and sizes as NumPy arrays to scale to big maps',
+                        choices=['python', 'numpy'],
+                        default='python'
+                        )
 
 
 def parse_arguments():
@@ -22,14 +90,58 @@ def parse_arguments():
                              'can be either linker .map files or .yaml descriptor')
     parser.add_argument('--output',
                         '-o',
-                        help='Name for the generated .svg file',
+                        help='Name for the generated .svg file, or .png file to draw a '
+                             'raster image',
                         default='map.svg')
     parser.add_argument('--convert',
-                        help='Performs the conversion of a .map file to .yaml if a .map file was passed without any additional step',
-                        action='store_true',
-                        default=False,
+                        help='Performs the conversion of a .map file to a .yaml file at the given '
+                             'path (map.yaml if omitted) without any additional step',
+                        nargs='?',
+                        const='map.yaml',
+                        default=None,
+                        metavar='OUTPUT',
                         required=False
                         )
+    parser.add_argument('--jobs',
+                        '-j',
+                        help='Number of processes used to parse .map files. 0 uses all the '
+                             'available cores. Defaults to 1',
+                        type=int,
+                        default=1
+                        )
+    add_loading_arguments(parser)
+    parser.add_argument('--writer',
+                        help='SVG writer: svgwrite (default), which builds the whole document '
+                             'before saving it, or stream, which writes every area to the '
+                             'output file as soon as it is drawn',
+                        choices=['svgwrite', 'stream'],
+                        default='svgwrite'
+                        )
+    parser.add_argument('--compact',
+                        help='Writes a smaller SVG file, using CSS classes instead of repeated '
+                             'style attributes, shared definitions for repeated elements and '
+                             'rounded coordinates. Implies --writer stream',
+                        action='store_true',
+                        default=False
+                        )
+    parser.add_argument('--precision',
+                        help='Number of decimals of the coordinates written by --compact. '
+                             'Defaults to 2',
+                        type=int,
+                        default=2
+                        )
+    parser.add_argument('--diff',
+                        help='Compares the input map file to the given one, built later, printing '
+                             'the sections that changed and drawing both maps side by side',
+                        default=None,
+                        metavar='NEW_MAP'
+                        )
+    parser.add_argument('--watch',
+                        help='Keeps running, rendering the diagram again whenever the map or '
+                             'configuration files change',
+                        action='store_true',
+                        default=False
+                        )
     parser.add_argument('--config',
                         '-c',
                         help='Configuration file (.yml). If not specified,'
@@ -39,7 +151,8 @@ def parse_arguments():
     return parser.parse_args()
 
 
-def get_area_views(_raw_sections, _base_style, config=None):
+def get_area_views(_raw_sections, _base_style, config=None, sections_class=Sections,
+                   area_cache=None):
     """
     Get the area view/s with the specified style and properties (if any)
 
@@ -52,6 +165,10 @@ def get_area_views(_raw_sections, _base_style, config=None):
     :param _raw_sections: A list of unprocessed sections to be selected from and displayed
     :param _base_style: Base / default style to build child styles from
     :param config: Optional, configuration object indicating number of areas, style, properties,...
+    :param sections_class: Optional, `Sections` backend holding the sections of every area view
+    :param area_cache: Optional, dictionary of the area views built by a previous call for the
+    same sections, by configuration and style. Area views found there are reused instead of
+    built again, and the dictionary is updated with the area views of this call
     :return: A list of configured area views
     """
     def get_default_area_view(sections, style):
@@ -61,10 +178,12 @@ def get_area_views(_raw_sections, _base_style, config=None):
         :param style: Base / default style to build child styles from
         :return: List of one element corresponding to a default area view
         """
-        return [AreaView(
-            sections=(Sections(sections=sections)),
-            style=copy.deepcopy(style)
-        )]
+        key = (None, style)
+        area_view = previous_area_views.get(key) or AreaView(
+            sections=(sections_class(sections)),
+            style=style
+        )
+        return [cache_area_view(key, area_view)]
 
     def get_custom_area_views(sections, style):
         """
@@ -75,35 +194,55 @@ def get_area_views(_raw_sections, _base_style, config=None):
         :return: List of one or various custom area views
         """
         area_views = []
+        all_sections = None
         for i, area_element in enumerate(area_configurations):
             area_config = safe_element_dict_get(area_element, 'area')
+            # Styles are interned, so that equal styles are the same object
+            key = (repr(area_config), style)
+            area_view = previous_area_views.get(key)
+            if area_view is not None:
+                area_views.append(cache_area_view(key, area_view))
+                continue
+
+            if all_sections is None:
+                all_sections = sections_class(sections)
             section_size = safe_element_dict_get(area_config, 'section-size', None)
             memory_range = safe_element_dict_get(area_config, 'range', None)
-            area_style = copy.deepcopy(style)
-            filtered_sections = (Sections(sections=copy.deepcopy(sections))
-                                 .filter_address_min(safe_element_list_get(memory_range, 0))
-                                 .filter_address_max(safe_element_list_get(memory_range, 1))
-                                 .filter_size_min(safe_element_list_get(section_size, 0))
-                                 .filter_size_max(safe_element_list_get(section_size, 1))
-                                 )
+            area_style = style
+            # Each area view gets its own views of the selected sections, so that it can modify
+            # them without affecting the other areas
+            filtered_sections = sections_class([
+                SectionView(section) for section in all_sections
+                .filter_address_min(safe_element_list_get(memory_range, 0))
+                .filter_address_max(safe_element_list_get(memory_range, 1))
+                .filter_size_min(safe_element_list_get(section_size, 0))
+                .filter_size_max(safe_element_list_get(section_size, 1))
+                .get_sections()])
             if len(filtered_sections.get_sections()) == 0:
                 logger.warning(f"Filter for area view with index {i} doesn't result in any"
                                f"section. Try re-adjusting memory range, size, ... This area "
                                f"will be omitted")
                 continue
 
-            area_views.append(
-                AreaView(
-                    sections=filtered_sections,
-                    area_config=area_config,
-                    style=area_style.override_properties_from(
-                        Style(style=safe_element_dict_get(area_config, 'style', None)))
-                )
-            )
+            area_views.append(cache_area_view(key, AreaView(
+                sections=filtered_sections,
+                area_config=area_config,
+                style=area_style.override_properties_from(
+                    Style(style=safe_element_dict_get(area_config, 'style', None)))
+            )))
 
         return area_views
 
+    def cache_area_view(key, area_view):
+        if area_cache is not None:
+            area_cache[key] = area_view
+        return area_view
+
     area_configurations = safe_element_dict_get(config, 'areas', []) or []
+    previous_area_views = {}
+    if area_cache is not None:
+        previous_area_views = dict(area_cache)
+        area_cache.clear()
 
     if len(area_configurations) == 0:
         return get_default_area_view(_raw_sections, _base_style)
@@ -111,36 +250,256 @@ def get_area_views(_raw_sections, _base_style, config=None):
         return get_custom_area_views(_raw_sections, _base_style)
 
 
-arguments = parse_arguments()
-raw_sections = MapFileLoader(arguments.input, arguments.convert).parse()
-base_style = Style().get_default()
+def load_configuration(config_filename, base_style):
+    """
+    Load a configuration file, if any, and get the properties of the diagram it describes
+
+    :param config_filename: Path of the configuration file, or None to use the default values
+    :param base_style: Base / default style to build the configured styles from
+    :return: Tuple of configuration object, base style, links and document size
+    """
+    links = None
+    document_size = DefaultAppValues.DOCUMENT_SIZE
+    configuration = {}
+
+    if config_filename:
+        with open(config_filename, 'r', encoding='utf-8') as file:
+            configuration = yaml.safe_load(file)
+            if configuration is None:
+                configuration = {}
+
+        default_style = base_style
+        style_config = safe_element_dict_get(configuration, 'style', None)
+        base_style = base_style.override_properties_from(Style(style=style_config))
+        yaml_links = safe_element_dict_get(configuration, 'links', None)
+        links_style = default_style.override_properties_from(
+            Style(style=safe_element_dict_get(yaml_links,
+                                              'style', None)))
+
+        links = Links(yaml_links, style=links_style)
+        document_size = safe_element_dict_get(configuration, 'size',
+                                              DefaultAppValues.DOCUMENT_SIZE)
+
+    return configuration, base_style, links, document_size
+
+
+def get_sections_class(backend):
+    """
+    Get the `Sections` class of a sections backend, falling back to the python one when NumPy
+    is not installed
+    """
+    if backend == 'numpy':
+        if NumpySections is None:
+            logger.warning("NumPy is not installed, falling back to the python sections backend")
+        else:
+            return NumpySections
+    return Sections
+
+
+def get_drawing_class(output, writer='svgwrite', compact=False, precision=2):
+    """
+    Get the drawing class used to write the given output file, or None for `svgwrite.Drawing`
+
+    .png files are drawn by `RasterDrawing`, which requires Pillow
+    """
+    if os.path.splitext(output)[1].lower() == '.png':
+        if RasterDrawing is None:
+            logger.error("Pillow is required to write .png images")
+            sys.exit(-1)
+        return RasterDrawing
+    if compact:
+        return functools.partial(CompactDrawing, precision=precision)
+    if writer == 'stream':
+        return StreamingDrawing
+    return None
+
+
+def render_map(raw_sections, config_filename, output, sections_class=Sections,
+               writer='svgwrite', compact=False, precision=2, render_cache=None):
+    """
+    Render the diagram of the given sections, as described by a configuration file, to the
+    output file
+
+    :param raw_sections: A list of unprocessed sections to be displayed
+    :param config_filename: Path of the configuration file, or None to use the default values
+    :param output: Path of the generated .svg or .png file
+    :param sections_class: Optional, `Sections` backend holding the sections of every area view
+    :param writer: Optional, SVG writer: `svgwrite` or `stream`
+    :param compact: Optional, whether to write a compact SVG file
+    :param precision: Optional, number of decimals of the coordinates of compact SVG files
+    :param render_cache: Optional, `RenderCache` holding the area views, drawn areas and
+    definitions of a previous render of the same sections, reused where their inputs did not
+    change
+    """
+    configuration, base_style, links, document_size = \
+        load_configuration(config_filename, Style().get_default())
+
+    if render_cache is None:
+        render_cache = RenderCache(area_views=None, fragments=None, definitions={})
+
+    MapRender(area_view=get_area_views(raw_sections, base_style, configuration, sections_class,
+                                       area_cache=render_cache.area_views),
+              links=links,
+              style=base_style,
+              file=output,
+              size=document_size,
+              drawing_class=get_drawing_class(output, writer, compact, precision),
+              compact=compact,
+              fragments=render_cache.fragments,
+              definitions=render_cache.definitions
+              ).draw()
+
+
+def load_sections(arguments, map_cache, filename=None):
+    """
+    Load the sections of a map file, the input file given at the command line arguments if no
+    other is given, followed by its symbols if they were requested
+    """
+    loader = MapFileLoader(filename or arguments.input,
+                           arguments.convert,
+                           cache=None if arguments.no_cache else map_cache,
+                           jobs=arguments.jobs or os.cpu_count(),
+                           use_mmap=arguments.mmap,
+                           symbols=arguments.symbols)
+    sections = loader.parse()
+    return sections + loader.get_symbol_sections()
+
+
+def render_diff(old_sections, new_sections, config_filename, output, sections_class=Sections,
+                drawing_class=None, compact=False):
+    """
+    Print the sections that changed between two maps, and render both maps side by side, with
+    changed sections highlighted and links between the old and new addresses of moved sections
+
+    :param old_sections: Sections of the old map
+    :param new_sections: Sections of the new map
+    :param config_filename: Path of the configuration file, or None to use the default values
+    :param output: Path of the generated .svg or .png file
+    :param sections_class: Optional, `Sections` backend holding the sections of every area view
+    :param drawing_class: Optional, drawing class writing the output file
+    :param compact: Optional, whether to write a compact SVG file
+    """
+    changes = diff_sections(old_sections, new_sections)
+    print(format_report(changes))
+
+    configuration, base_style, _, _ = load_configuration(config_filename,
+                                                         Style().get_default())
+    old_configuration, new_configuration, document_size = \
+        get_diff_configurations(configuration, 'old', 'new')
+    old_area_views = get_area_views(old_sections, base_style, old_configuration, sections_class)
+    new_area_views = get_area_views(new_sections, base_style, new_configuration, sections_class)
+    highlight_changes(old_area_views, changes, 'old')
+    highlight_changes(new_area_views, changes, 'new')
+
+    MapRender(area_view=old_area_views + new_area_views,
+              links=None,
+              style=base_style,
+              file=output,
+              size=document_size,
+              drawing_class=drawing_class,
+              compact=compact,
+              area_links=get_move_links(old_area_views, new_area_views, changes),
+              area_links_style=Style.get_default().override_properties_from(MOVE_LINK_STYLE)
+              ).draw()
+
+
+def get_file_status(filename):
+    """
+    Get the modification time and size of a file, or None if it cannot be accessed
+    """
+    try:
+        status = os.stat(filename)
+    except OSError:
+        return None
+    return status.st_mtime_ns, status.st_size
+
+
+def watch(arguments, map_cache, interval=WATCH_INTERVAL):
+    """
+    Render the diagram, then render it again whenever the map or configuration files change,
+    polling their modification time and size every `interval` seconds until interrupted
+
+    The parsed map file is kept in memory, and only parsed again when the map file changes. When
+    only the configuration file changes, areas whose configuration and style did not change
+    reuse their area views and drawn elements from the previous render. Errors are reported
+    without stopping, as files are often invalid while being edited
+    """
+    filenames = [arguments.input] + ([arguments.config] if arguments.config else [])
+    sections_class = get_sections_class(arguments.backend)
+    statuses = None
+    map_status = None
+    raw_sections = None
+    render_cache = None
+
+    try:
+        while True:
+            new_statuses = [get_file_status(filename) for filename in filenames]
+            if new_statuses != statuses:
+                start = time.perf_counter()
+                try:
+                    if raw_sections is None or new_statuses[0] != map_status:
+                        # Cleared first, so that the map file is parsed again on the next
+                        # change if parsing it fails
+                        raw_sections = None
+                        raw_sections = load_sections(arguments, map_cache)
+                        map_status = new_statuses[0]
+                        render_cache = RenderCache(area_views={}, fragments={}, definitions={})
+
+                    render_map(raw_sections,
+                               arguments.config,
+                               arguments.output,
+                               sections_class=sections_class,
+                               writer=arguments.writer,
+                               compact=arguments.compact,
+                               precision=arguments.precision,
+                               render_cache=render_cache)
+                    logger.info(f"{arguments.output} rendered in "
+                                f"{time.perf_counter() - start:.2f} s, watching for changes")
+                except (Exception, SystemExit) as error:  # pylint: disable=broad-exception-caught
+                    logger.error(f"Failed to render {arguments.output}: {error}")
+                statuses = new_statuses
+
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        pass
+
 
+def main():
+    arguments = parse_arguments()
+    map_cache = MapCache(arguments.cache_dir)
+    if arguments.clear_cache:
+        map_cache.clear()
 
-links = None
-document_size = DefaultAppValues.DOCUMENT_SIZE
-configuration = {}
+    if arguments.diff:
+        if arguments.convert is not None or arguments.watch:
+            logger.error("--diff flag cannot be used together with --convert or --watch")
+            sys.exit(-1)
+        render_diff(load_sections(arguments, map_cache),
+                    load_sections(arguments, map_cache, arguments.diff),
+                    arguments.config,
+                    arguments.output,
+                    sections_class=get_sections_class(arguments.backend),
+                    drawing_class=get_drawing_class(arguments.output, arguments.writer,
+                                                    arguments.compact, arguments.precision),
+                    compact=arguments.compact)
+        return
 
-# Apply custom configuration if configuration file is available
-if arguments.config:
-    with open(arguments.config, 'r', encoding='utf-8') as file:
-        configuration = yaml.safe_load(file)
-        if configuration is None:
-            configuration = {}
+    if arguments.watch:
+        if arguments.convert is not None:
+            logger.error("--watch and --convert flags cannot be used together")
+            sys.exit(-1)
+        watch(arguments, map_cache)
+        return
 
-    base_style_cpy = copy.deepcopy(base_style)
-    style_config = safe_element_dict_get(configuration, 'style', None)
-    base_style.override_properties_from(Style(style=style_config))
-    yaml_links = safe_element_dict_get(configuration, 'links', None)
-    links_style = base_style_cpy.override_properties_from(
-        Style(style=safe_element_dict_get(yaml_links,
-                                          'style', None)))
+    raw_sections = load_sections(arguments, map_cache)
+    render_map(raw_sections,
+               arguments.config,
+               arguments.output,
+               sections_class=get_sections_class(arguments.backend),
+               writer=arguments.writer,
+               compact=arguments.compact,
+               precision=arguments.precision)
 
-    links = Links(yaml_links, style=links_style)
-    document_size = safe_element_dict_get(configuration, 'size', DefaultAppValues.DOCUMENT_SIZE)
 
-MapRender(area_view=get_area_views(raw_sections, base_style, configuration),
-          links=links,
-          style=base_style,
-          file=arguments.output,
-          size=document_size
-          ).draw()
+if __name__ == '__main__':
+    main()
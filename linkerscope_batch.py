@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Render a batch of diagrams, described by a manifest file, in a single run
+
+Every map file is parsed once, however many jobs render it, and jobs are rendered by a pool of
+worker processes. The manifest is a yaml file with a list of jobs, whose relative paths are
+relative to the manifest file:
+
+    jobs:
+      - input: build/f103.map
+        config: configs/f103.yaml
+        output: diagrams/f103.svg
+      - input: build/f103.map
+        config: configs/f103_ram.yaml
+        output: diagrams/f103_ram.png
+        compact: true
+
+Besides `input`, `output` and `config` (optional), jobs accept the `writer`, `compact` and
+`precision` options of linkerscope.py
+
+Usage: ./linkerscope_batch.py manifest.yaml [--jobs N]
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import yaml
+
+from helpers import safe_element_dict_get
+from linkerscope import add_loading_arguments, get_sections_class, render_map
+from logger import logger
+from map_cache import MapCache
+from map_file_loader import MapFileLoader
+from section import SectionView
+
+JOB_OPTIONS = {'input', 'output', 'config', 'writer', 'compact', 'precision'}
+
+# Sections and symbol table of every map file, by path, shared with the worker processes when
+# they are started
+_shared_maps = {}
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('manifest',
+                        help='Manifest file (.yaml) with the list of jobs to render')
+    parser.add_argument('--jobs',
+                        '-j',
+                        help='Number of worker processes rendering the jobs. 0 uses all the '
+                             'available cores. Defaults to 0',
+                        type=int,
+                        default=0
+                        )
+    add_loading_arguments(parser)
+
+    return parser.parse_args()
+
+
+def load_manifest(filename):
+    """
+    Read the jobs of a manifest file, resolving their paths relative to the manifest
+
+    :param filename: Path of the manifest file
+    :return: List of jobs, as dictionaries of job options
+    """
+    with open(filename, 'r', encoding='utf-8') as file:
+        manifest = yaml.safe_load(file)
+
+    base_directory = os.path.dirname(os.path.abspath(filename))
+    jobs = []
+    for i, job in enumerate(safe_element_dict_get(manifest, 'jobs', []) or []):
+        if not isinstance(job, dict) or 'input' not in job or 'output' not in job:
+            logger.error(f"Job with index {i} at {filename} needs both an input and an output")
+            sys.exit(-1)
+
+        unknown_options = set(job) - JOB_OPTIONS
+        if unknown_options:
+            logger.warning(f"Unknown options {sorted(unknown_options)} of job with index {i} "
+                           f"have been ignored")
+
+        job = {option: value for option, value in job.items() if option in JOB_OPTIONS}
+        for option in ('input', 'output', 'config'):
+            if job.get(option) is not None:
+                job[option] = os.path.join(base_directory, str(job[option]))
+        jobs.append(job)
+
+    return jobs
+
+
+def load_maps(filenames, cache, jobs, use_mmap, symbols):
+    """
+    Parse every map file once
+
+    :return: Tuple of the sections and symbol table of every map file that could be parsed, by
+    path, and the errors of the map files that could not, by path
+    """
+    maps = {}
+    errors = {}
+    for filename in filenames:
+        start = time.perf_counter()
+        try:
+            loader = MapFileLoader(filename, cache=cache, jobs=jobs, use_mmap=use_mmap,
+                                   symbols=symbols)
+            maps[filename] = loader.parse(), loader.symbol_table
+        except (Exception, SystemExit) as error:  # pylint: disable=broad-exception-caught
+            errors[filename] = str(error) or type(error).__name__
+            logger.error(f"{filename}: failed to load: {errors[filename]}")
+            continue
+        sections, symbol_table = maps[filename]
+        symbol_count = 0 if symbol_table is None else len(symbol_table)
+        logger.info(f"{filename}: {len(sections)} sections and {symbol_count} symbols loaded in "
+                    f"{time.perf_counter() - start:.2f} s")
+
+    return maps, errors
+
+
+def _init_worker(maps):
+    """
+    Keep the sections and symbol table of every map file at the worker process
+
+    Worker processes are forked, where available, so that they share the parsed maps with the
+    main process instead of receiving a copy of them. Symbol tables are array-backed, so sharing
+    them does not copy their pages as reference counting does for Python objects
+    """
+    _shared_maps.update(maps)
+
+
+def render_job(job, backend):
+    """
+    Render a job, from the sections of its map file shared with the worker process
+
+    :return: Tuple of error message (None if the job succeeded) and elapsed time in seconds
+    """
+    start = time.perf_counter()
+    try:
+        # Jobs rendering the same map file get their own views of its sections, so that they
+        # do not see each other's changes, and build their own sections from its symbols
+        sections, symbol_table = _shared_maps[job['input']]
+        raw_sections = [SectionView(section) for section in sections]
+        if symbol_table is not None:
+            raw_sections.extend(symbol_table.iter_sections())
+        os.makedirs(os.path.dirname(job['output']), exist_ok=True)
+        render_map(raw_sections,
+                   job.get('config'),
+                   job['output'],
+                   sections_class=get_sections_class(backend),
+                   writer=job.get('writer', 'svgwrite'),
+                   compact=bool(job.get('compact', False)),
+                   precision=int(job.get('precision', 2)))
+    except (Exception, SystemExit) as error:  # pylint: disable=broad-exception-caught
+        return str(error) or type(error).__name__, time.perf_counter() - start
+    return None, time.perf_counter() - start
+
+
+def main():
+    arguments = parse_arguments()
+    start = time.perf_counter()
+    jobs = load_manifest(arguments.manifest)
+    workers = min(arguments.jobs or os.cpu_count(), max(1, len(jobs)))
+
+    map_cache = MapCache(arguments.cache_dir)
+    if arguments.clear_cache:
+        map_cache.clear()
+
+    filenames = list(dict.fromkeys(job['input'] for job in jobs))
+    maps, errors = load_maps(filenames,
+                             cache=None if arguments.no_cache else map_cache,
+                             jobs=workers,
+                             use_mmap=arguments.mmap,
+                             symbols=arguments.symbols)
+
+    failures = 0
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(maps,)) as executor:
+        futures = {}
+        for job in jobs:
+            if job['input'] in errors:
+                failures += 1
+                logger.error(f"{job['output']}: FAILED: {job['input']} could not be loaded")
+                continue
+            futures[executor.submit(render_job, job, arguments.backend)] = job
+
+        for future in as_completed(futures):
+            job = futures[future]
+            error, elapsed = future.result()
+            if error is None:
+                logger.info(f"{job['output']}: done in {elapsed:.2f} s")
+            else:
+                failures += 1
+                logger.error(f"{job['output']}: FAILED in {elapsed:.2f} s: {error}")
+
+    logger.info(f"{len(jobs) - failures} of {len(jobs)} jobs rendered in "
+                f"{time.perf_counter() - start:.2f} s using {workers} worker processes")
+    if failures:
+        sys.exit(-1)
+
+
+if __name__ == '__main__':
+    main()
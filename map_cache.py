@@ -0,0 +1,119 @@
+import hashlib
+import os
+import pickle
+import tempfile
+from contextlib import suppress
+
+from logger import logger
+from section import Section
+
+
+class MapCache:
+    """
+    On-disk cache of parsed map files
+
+    Entries are keyed by the content hash of the map file and the version of the parser that
+    produced them, so an entry is reused whenever the same map file is rendered again, no matter
+    its path or modification time, and is never reused once the parser output changes
+    """
+    HASH_BLOCK_SIZE = 1 << 20
+
+    def __init__(self, directory=None):
+        self.directory = directory if directory is not None else self.get_default_directory()
+
+    @staticmethod
+    def get_default_directory():
+        """
+        Get the default cache location, following the XDG base directory specification
+        :return: Path to the default cache directory
+        """
+        cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'),
+                                                                      '.cache')
+        return os.path.join(cache_home, 'linkerscope')
+
+    def get_key(self, filename, version):
+        """
+        Compute the cache key for a given map file
+
+        :param filename: Path to the map file
+        :param version: Version of the parser that would process the file
+        :return: Hexadecimal key identifying the file contents and parser version
+        """
+        digest = hashlib.sha256(f'v{version}:'.encode('utf8'))
+        with open(filename, 'rb') as file:
+            for block in iter(lambda: file.read(self.HASH_BLOCK_SIZE), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def _get_entry_path(self, key):
+        return os.path.join(self.directory, f'{key}.pickle')
+
+    def load(self, key):
+        """
+        Get the sections and symbols stored for a given key
+
+        :param key: Key, as returned by `get_key`
+        :return: Tuple of the list of sections and the `SymbolTable` (None if symbols were not
+        stored), or None if there is no valid entry for the key
+        """
+        try:
+            with open(self._get_entry_path(key), 'rb') as file:
+                records, symbol_table = pickle.load(file)
+        except FileNotFoundError:
+            return None
+        except (OSError, pickle.UnpicklingError, EOFError, ValueError) as error:
+            logger.warning(f"Ignoring unreadable parse cache entry {key}: {error}")
+            return None
+
+        return [Section(address=address,
+                        size=size,
+                        id=_id,
+                        name=name,
+                        parent=parent,
+                        _type=_type,
+                        flags=flags)
+                for _type, parent, _id, address, size, name, flags in records], symbol_table
+
+    def store(self, key, sections, symbol_table=None):
+        """
+        Store the sections and symbols for a given key
+
+        The entry is written to a temporary file first and then moved in place, so concurrent
+        runs sharing the cache never read a partially written entry
+
+        :param key: Key, as returned by `get_key`
+        :param sections: List of sections to store
+        :param symbol_table: Optional, `SymbolTable` to store, kept in its columnar form
+        """
+        records = [(section.type, section.parent, section.id, section.address, section.size,
+                    section.name, section.flag_bits)
+                   for section in sections]
+
+        temporary_path = None
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            handle, temporary_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            with os.fdopen(handle, 'wb') as file:
+                pickle.dump((records, symbol_table), file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporary_path, self._get_entry_path(key))
+        except (OSError, pickle.PicklingError) as error:
+            logger.warning(f"Could not write parse cache entry at {self.directory}: {error}")
+        finally:
+            # The temporary file is only left if the entry could not be written
+            if temporary_path is not None:
+                with suppress(FileNotFoundError):
+                    os.remove(temporary_path)
+
+    def clear(self):
+        """
+        Remove all the entries of the cache, and the temporary files of entries that could not be
+        written. Any other file at the cache directory is kept
+        """
+        if not os.path.isdir(self.directory):
+            return
+
+        for filename in os.listdir(self.directory):
+            if filename.endswith(('.pickle', '.tmp')):
+                with suppress(FileNotFoundError):
+                    os.remove(os.path.join(self.directory, filename))
+        logger.info(f"Parse cache at {self.directory} cleared")
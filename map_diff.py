@@ -0,0 +1,334 @@
+from collections import namedtuple
+
+from helpers import safe_element_dict_get, safe_element_list_get, DefaultAppValues
+from style import Style
+
+# Section matched between two maps, either of `old` and `new` being None if the section is only
+# at one of them. `delta` is the size change in bytes
+SectionChange = namedtuple('SectionChange', ['parent', 'id', 'status', 'old', 'new', 'delta'])
+
+ADDED = 'added'
+REMOVED = 'removed'
+GROWN = 'grown'
+SHRUNK = 'shrunk'
+MOVED = 'moved'
+UNCHANGED = 'unchanged'
+
+# Fill of the changed sections at diff diagrams, by status
+DIFF_STYLES = {ADDED: Style({'fill': '#4caf50'}),
+               REMOVED: Style({'fill': '#e53935'}),
+               GROWN: Style({'fill': '#fb8c00'}),
+               SHRUNK: Style({'fill': '#1e88e5'}),
+               MOVED: Style({'fill': '#fdd835'})}
+
+# Style of the links between the old and new positions of moved sections
+MOVE_LINK_STYLE = Style({'stroke': 'grey', 'stroke_width': 1, 'opacity': 0.6, 'fill': 'none'})
+
+
+def _sort_key(section):
+    return section.parent or '', section.id, section.address, section.size
+
+
+def _get_object(section):
+    # Only symbols know the object file contributing them
+    return getattr(section, 'object', None)
+
+
+# Number of sections past a mismatch at which added or removed sections are looked for, and
+# number of sections that must match after them for them to be taken as added or removed
+RESYNC_WINDOW = 16
+RESYNC_RUN = 3
+
+
+def _get_group_end(keys, start, key):
+    end = start
+    while end < len(keys) and keys[end] == key:
+        end += 1
+    return end
+
+
+def _pair_in_place(old_group, new_group):
+    """
+    Pair the sections with the same address, size and object file at both maps, walking both
+    groups at once in address and size order
+
+    :return: Tuple of the pairs, and the old and new sections left unpaired, in address order
+    """
+    pairs = []
+    unpaired_old = []
+    unpaired_new = []
+    old_index, new_index = 0, 0
+    while old_index < len(old_group) and new_index < len(new_group):
+        old, new = old_group[old_index], new_group[new_index]
+        old_key, new_key = (old.address, old.size), (new.address, new.size)
+        if old_key < new_key:
+            unpaired_old.append(old)
+            old_index += 1
+        elif new_key < old_key:
+            unpaired_new.append(new)
+            new_index += 1
+        else:
+            if _get_object(old) == _get_object(new):
+                pairs.append((old, new))
+            else:
+                unpaired_old.append(old)
+                unpaired_new.append(new)
+            old_index += 1
+            new_index += 1
+
+    unpaired_old.extend(old_group[old_index:])
+    unpaired_new.extend(new_group[new_index:])
+    return pairs, unpaired_old, unpaired_new
+
+
+def _find_skip(old_keys, new_keys, old_index, new_index):
+    """
+    Find the closest sections, past two mismatched ones, from which both maps match again for
+    `RESYNC_RUN` sections, or up to the end of either map
+
+    :return: Tuple of the number of old and new sections to skip, as removed and added, or
+    (0, 0) if the maps do not match again within `RESYNC_WINDOW` sections
+    """
+    def runs_match(old_start, new_start):
+        count = min(RESYNC_RUN, len(old_keys) - old_start, len(new_keys) - new_start)
+        return count > 0 and \
+            old_keys[old_start:old_start + count] == new_keys[new_start:new_start + count]
+
+    for distance in range(1, RESYNC_WINDOW + 1):
+        if runs_match(old_index, new_index + distance):
+            return 0, distance
+        if runs_match(old_index + distance, new_index):
+            return distance, 0
+    return 0, 0
+
+
+def _align(old_group, new_group):
+    """
+    Pair the sections of both maps in address order, skipping the runs of sections added or
+    removed, which are told apart by object file and size as the sections after them move
+
+    :return: List of (old, new) pairs, either being None if the section is only at one of the maps
+    """
+    old_keys = [(_get_object(section), section.size) for section in old_group]
+    new_keys = [(_get_object(section), section.size) for section in new_group]
+
+    pairs = []
+    old_index, new_index = 0, 0
+    while old_index < len(old_group) and new_index < len(new_group):
+        old_skip, new_skip = (0, 0) if old_keys[old_index] == new_keys[new_index] \
+            else _find_skip(old_keys, new_keys, old_index, new_index)
+        pairs.extend((old, None) for old in old_group[old_index:old_index + old_skip])
+        pairs.extend((None, new) for new in new_group[new_index:new_index + new_skip])
+        old_index += old_skip
+        new_index += new_skip
+        pairs.append((old_group[old_index], new_group[new_index]))
+        old_index += 1
+        new_index += 1
+
+    pairs.extend((old, None) for old in old_group[old_index:])
+    pairs.extend((None, new) for new in new_group[new_index:])
+    return pairs
+
+
+def _match_group(old_group, new_group):
+    """
+    Pair the sections sharing parent and id at both maps
+
+    Sections with the same address, size and object file are paired first. The
+    rest are aligned in address order, so that a section added to or removed from the group
+    does not shift the pairs of the sections after it (see `_align`)
+
+    :param old_group: Sections of the old map with the same parent and id, in address order
+    :param new_group: Sections of the new map with the same parent and id, in address order
+    :return: List of (old, new) pairs in address order, either being None if the section is only
+    at one of the maps
+    """
+    if len(old_group) == 1 and len(new_group) == 1:
+        return [(old_group[0], new_group[0])]
+
+    pairs, old_group, new_group = _pair_in_place(old_group, new_group)
+    if not old_group and not new_group:
+        return pairs
+    pairs.extend(_align(old_group, new_group))
+    return sorted(pairs, key=lambda pair: (pair[0] or pair[1]).address)
+
+
+def _get_change(key, old, new):
+    if old is None:
+        return SectionChange(*key, ADDED, None, new, new.size)
+    if new is None:
+        return SectionChange(*key, REMOVED, old, None, -old.size)
+
+    delta = new.size - old.size
+    if delta > 0:
+        status = GROWN
+    elif delta < 0:
+        status = SHRUNK
+    elif new.address != old.address:
+        status = MOVED
+    else:
+        status = UNCHANGED
+    return SectionChange(*key, status, old, new, delta)
+
+
+def diff_sections(old_sections, new_sections):
+    """
+    Match the sections of two maps by parent and id, and find how each of them changed
+
+    Both lists of sections are sorted by parent, id and address, and then merged in a single
+    pass, so that matching takes O(n log n) time whatever the number of sections. Sections
+    sharing parent and id at the same map, such as input sections with the same name from
+    different objects, are paired by object file, address and size first (see `_match_group`)
+
+    :param old_sections: Sections of the old map
+    :param new_sections: Sections of the new map
+    :return: List of `SectionChange`, one per section found at either map, sorted by parent and id
+    """
+    old_sections = sorted(old_sections, key=_sort_key)
+    new_sections = sorted(new_sections, key=_sort_key)
+    old_keys = [(section.parent or '', section.id) for section in old_sections]
+    new_keys = [(section.parent or '', section.id) for section in new_sections]
+
+    changes = []
+    old_index, new_index = 0, 0
+    old_count, new_count = len(old_sections), len(new_sections)
+    while old_index < old_count or new_index < new_count:
+        if new_index == new_count or \
+                (old_index < old_count and old_keys[old_index] <= new_keys[new_index]):
+            key = old_keys[old_index]
+        else:
+            key = new_keys[new_index]
+        old_end = _get_group_end(old_keys, old_index, key)
+        new_end = _get_group_end(new_keys, new_index, key)
+        changes.extend(_get_change(key, old, new)
+                       for old, new in _match_group(old_sections[old_index:old_end],
+                                                    new_sections[new_index:new_end]))
+        old_index, new_index = old_end, new_end
+
+    return changes
+
+
+def format_report(changes):
+    """
+    Format the changed sections as a table, sorted by decreasing absolute size change, followed
+    by a summary of the changes
+
+    :param changes: List of `SectionChange`
+    :return: Report text
+    """
+    changed = sorted((change for change in changes if change.status != UNCHANGED),
+                     key=lambda change: (-abs(change.delta), change.parent, change.id))
+
+    def address(section):
+        return hex(section.address) if section is not None else '-'
+
+    def size(section):
+        return str(section.size) if section is not None else '-'
+
+    lines = [f"{'Status':<9} {'Delta':>10} {'Old size':>10} {'New size':>10} "
+             f"{'Old address':>18} {'New address':>18}  Section"]
+    for change in changed:
+        # Sections of yaml map files without parent have 'none' as parent
+        name = change.id if change.parent in ('', 'none') else f'{change.parent}/{change.id}'
+        lines.append(f"{change.status:<9} {change.delta:>+10} {size(change.old):>10} "
+                     f"{size(change.new):>10} {address(change.old):>18} "
+                     f"{address(change.new):>18}  {name}")
+
+    counts = {status: 0 for status in (ADDED, REMOVED, GROWN, SHRUNK, MOVED)}
+    for change in changed:
+        counts[change.status] += 1
+    summary = ', '.join(f'{count} {status}' for status, count in counts.items())
+    lines.append(f"{len(changes)} sections: {summary}. Total size change: "
+                 f"{sum(change.delta for change in changes):+} bytes")
+    return '\n'.join(lines)
+
+
+def get_diff_configurations(configuration, old_title, new_title):
+    """
+    Get the configurations drawing the old and new maps side by side
+
+    The old map is drawn with the configured areas, and the new one with the same areas moved
+    right by the width of the document, which is doubled. If no areas are configured, each map
+    is drawn as a single area. Links are left out, as they would join areas of different maps
+
+    :param configuration: Configuration object of the diagram
+    :param old_title: Text appended to the titles of the areas of the old map
+    :param new_title: Text appended to the titles of the areas of the new map
+    :return: Tuple of the configurations of the old and new maps, and the document size
+    """
+    document_size = safe_element_dict_get(configuration, 'size', DefaultAppValues.DOCUMENT_SIZE)
+    area_configurations = safe_element_dict_get(configuration, 'areas', []) or [{'area': {}}]
+
+    def get_configuration(title, offset_x):
+        areas = []
+        for area_element in area_configurations:
+            area_config = dict(safe_element_dict_get(area_element, 'area', None) or {})
+            position = safe_element_dict_get(area_config, 'pos', None)
+            area_config['pos'] = [
+                safe_element_list_get(position, 0, default=DefaultAppValues.POSITION_X) + offset_x,
+                safe_element_list_get(position, 1, default=DefaultAppValues.POSITION_Y)]
+            area_title = safe_element_dict_get(area_config, 'title', DefaultAppValues.TITLE)
+            area_config['title'] = f'{area_title} ({title})' if area_title else title
+            areas.append({'area': area_config})
+        return {**(configuration or {}), 'areas': areas, 'links': None}
+
+    return (get_configuration(old_title, 0),
+            get_configuration(new_title, document_size[0]),
+            (2 * document_size[0], document_size[1]))
+
+
+def highlight_changes(area_views, changes, side):
+    """
+    Fill the changed sections of the area views of one of the maps with the style of their
+    change (see `DIFF_STYLES`)
+
+    :param area_views: Area views of the old or new map
+    :param changes: List of `SectionChange`
+    :param side: Either 'old' or 'new', the map drawn by the area views
+    """
+    statuses = {getattr(change, side): change.status for change in changes
+                if change.status in DIFF_STYLES and getattr(change, side) is not None}
+
+    for area_view in area_views:
+        for section in area_view.sections.get_sections():
+            # Area views hold views of the parsed sections
+            status = statuses.get(getattr(section, 'base', section))
+            if status is not None:
+                section.style = section.style.override_properties_from(DIFF_STYLES[status])
+
+
+def get_move_links(old_area_views, new_area_views, changes):
+    """
+    Get the links joining the old and new addresses of the sections whose address changed, for
+    the sections shown by the same area at both maps
+
+    :return: List of (old area view, old address, new area view, new address) tuples
+    """
+    def get_area_key(area_view):
+        # Areas of both maps only differ by their position and title
+        return repr({name: value for name, value in area_view.area.items()
+                     if name not in ('pos', 'title')})
+
+    def get_shown_sections(area_view):
+        # Area views hold views of the parsed sections
+        return {getattr(section, 'base', section) for section in area_view.sections.get_sections()}
+
+    new_area_views_by_key = {}
+    for new_area_view in new_area_views:
+        new_area_views_by_key.setdefault(get_area_key(new_area_view), new_area_view)
+    area_view_pairs = [(old_area_view, get_shown_sections(old_area_view), new_area_view,
+                        get_shown_sections(new_area_view))
+                       for old_area_view in old_area_views
+                       for new_area_view in [new_area_views_by_key.get(get_area_key(old_area_view))]
+                       if new_area_view is not None]
+
+    links = []
+    for change in changes:
+        if change.old is None or change.new is None or change.old.address == change.new.address:
+            continue
+        for old_area_view, old_sections, new_area_view, new_sections in area_view_pairs:
+            if change.old in old_sections and change.new in new_sections:
+                links.append((old_area_view, change.old.address,
+                              new_area_view, change.new.address))
+                break
+    return links
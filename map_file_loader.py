@@ -1,33 +1,55 @@
 import os
 import sys
-import yaml
 from logger import logger
 from section import Section
 from gnu_linker_map_parser import GNULinkerMapParser
+from binary_map import BinaryMap
+from yaml_map_reader import YamlMapReader
 
 
 class MapFileLoader:
     """
     Takes input file provided by user and loads it in memory for further processing.
-    Depending on the type of file (.map or .yaml) will include an additional conversion step and
-    create a temporary .yaml file
+    Depending on the type of file (.map, .yaml or binary map) the sections are either parsed from
+    the linker map file or read from the yaml or binary map file. Binary map files are recognized
+    by their magic bytes, whatever their extension. A .map file can additionally be converted to a
+    .yaml file, or to a binary map file if the output path has the `.lsmap` extension, when a
+    conversion output path is provided.
+    If a parse cache is provided, parsed .map files are looked up and stored there.
+    .map files are parsed using `jobs` processes, and scanned as memory mapped files if `use_mmap`.
+    If `symbols` is set, the symbols of .map files are loaded as well, into the `SymbolTable` at
+    `symbol_table`
     """
-    def __init__(self, file, convert):
+    def __init__(self, file, convert=None, cache=None, jobs=1, use_mmap=False, symbols=False):
         self.input_filename = file
         self.convert = convert
+        self.cache = cache
+        self.jobs = jobs
+        self.use_mmap = use_mmap
+        self.symbols = symbols
+        self.symbol_table = None
 
     def parse(self):
         _, file_extension = os.path.splitext(self.input_filename)
 
+        if BinaryMap.is_binary_map(self.input_filename):
+            if self.convert is not None:
+                logger.error("--convert flag requires a .map file")
+                exit(-1)
+            return self.parse_binary(self.input_filename)
+
         if file_extension == '.map':
-            self.parse_map(self.input_filename)
-            if self.convert:
-                logger.info(".map file converted and saved as map.yaml")
+            sections, self.symbol_table = self.parse_map_cached(self.input_filename, self.cache,
+                                                                self.jobs, self.use_mmap,
+                                                                self.symbols)
+            if self.convert is not None:
+                self.write(sections + self.get_symbol_sections(), self.convert)
+                logger.info(f".map file converted and saved as {self.convert}")
                 exit(0)
-            return self.parse_yaml('map.yaml')
+            return sections
 
         if file_extension in ['.yaml', '.yml']:
-            if self.convert:
+            if self.convert is not None:
                 logger.error("--convert flag requires a .map file")
                 exit(-1)
             return self.parse_yaml(self.input_filename)
@@ -37,24 +59,115 @@ class MapFileLoader:
 
     @staticmethod
     def parse_yaml(filename):
-        sections = []
+        """
+        Read the sections of a yaml map file, one `map` element at a time
+
+        :param filename: Path to the yaml map file
+        :return: List of sections
+        """
+        return [MapFileLoader.section_from_element(element)
+                for element in YamlMapReader(filename)]
+
+    @staticmethod
+    def section_from_element(element):
+        """
+        Build a section from an element of the `map` list of a yaml map file
+
+        :param element: Dictionary describing the section
+        :return: Section described by the element
+        """
+        return Section(address=element['address'],
+                       size=element['size'],
+                       id=element['id'],
+                       name=element.get('name'),
+                       parent=element.get('parent', 'none'),
+                       _type=element.get('type', 'area'),
+                       flags=element.get('flags', '')
+                       )
+
+    @staticmethod
+    def parse_binary(filename):
+        try:
+            with BinaryMap(filename) as binary_map:
+                return binary_map.get_sections()
+        except ValueError as error:
+            logger.error(str(error))
+            sys.exit(-1)
 
-        with open(filename, 'r', encoding='utf-8') as file:
-            y = yaml.safe_load(file)
+    @staticmethod
+    def write(sections, filename):
+        """
+        Write a list of sections to a binary map file if the filename has the binary map file
+        extension, or to a yaml map file otherwise
+
+        :param sections: List of sections to write
+        :param filename: Path of the file to write
+        """
+        _, file_extension = os.path.splitext(filename)
+        if file_extension == BinaryMap.EXTENSION:
+            BinaryMap.write(sections, filename)
+        else:
+            GNULinkerMapParser.write_yaml(sections, filename)
+
+    @staticmethod
+    def parse_map_cached(input_filename, cache=None, jobs=1, use_mmap=False, symbols=False):
+        """
+        Parse a GNU linker map file, reusing the result of a previous parse of the same content if
+        available at the cache
+
+        :param input_filename: Path to the linker map file
+        :param cache: Optional, `MapCache` to look up and store parsed sections
+        :param jobs: Number of processes to parse the map file with
+        :param use_mmap: Whether to scan the map file as a memory mapped file
+        :param symbols: Whether to load the symbols of the map file as well
+        :return: Tuple of the list of parsed sections and the `SymbolTable` of the map file, None
+        if symbols were not requested
+        """
+        if cache is None:
+            return MapFileLoader.parse_map(input_filename, jobs=jobs, use_mmap=use_mmap,
+                                           symbols=symbols)
 
-        for element in y['map']:
-            sections.append(Section(address=element['address'],
-                                    size=element['size'],
-                                    id=element['id'],
-                                    name=element.get('name'),
-                                    parent=element.get('parent', 'none'),
-                                    _type=element.get('type', 'area'),
-                                    flags=element.get('flags', '')
-                                    )
-                            )
+        version = f'{GNULinkerMapParser.VERSION}+symbols' if symbols \
+            else GNULinkerMapParser.VERSION
+        key = cache.get_key(input_filename, version)
+        cached = cache.load(key)
+        if cached is not None:
+            logger.info(f"Using cached sections for {input_filename}")
+            return cached
 
-        return sections
+        sections, symbol_table = MapFileLoader.parse_map(input_filename, jobs=jobs,
+                                                         use_mmap=use_mmap, symbols=symbols)
+        cache.store(key, sections, symbol_table)
+        return sections, symbol_table
 
     @staticmethod
-    def parse_map(input_filename):
-        GNULinkerMapParser(input_filename=input_filename, output_filename='map.yaml').parse()
+    def parse_map(input_filename, output_filename=None, jobs=1, use_mmap=False, symbols=False):
+        """
+        Parse a GNU linker map file into a list of sections, areas first
+
+        :param input_filename: Path to the linker map file
+        :param output_filename: Optional, path of a yaml map file to write the parsed sections to
+        :param jobs: Number of processes to parse the map file with
+        :param use_mmap: Whether to scan the map file as a memory mapped file
+        :param symbols: Whether to load the symbols of the map file into a `SymbolTable` as well
+        :return: Tuple of the list of parsed sections and the `SymbolTable` of the map file, None
+        if symbols were not requested
+        """
+        parser = GNULinkerMapParser(input_filename=input_filename,
+                                    output_filename=output_filename,
+                                    jobs=jobs,
+                                    use_mmap=use_mmap,
+                                    symbols=symbols)
+        parser.parse()
+        return parser.sections + parser.subsections, parser.symbol_table
+
+    def get_symbol_sections(self):
+        """
+        Get the symbols loaded by the last parse as sections of type `symbol`
+
+        Symbols are kept in their columnar `SymbolTable` while loaded and cached, and are only
+        built as sections when they are going to be drawn or written
+
+        :return: List of `SymbolSection`, empty if no symbols were loaded
+        """
+        return [] if self.symbol_table is None else list(self.symbol_table.iter_sections())
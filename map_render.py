@@ -1,8 +1,8 @@
-from math import cos
+from math import cos, floor, pi, sin
 from svgwrite import Drawing
 import svgwrite
 
-from helpers import DefaultAppValues
+from helpers import DefaultAppValues, pairwise
 from labels import Side
 from logger import logger
 from section import Section
@@ -25,13 +25,44 @@ class MapRender:
         self.area_views = area_view
         self.current_style = Style()
         self.links = links
+        self.compact = kwargs.get('compact', False)
+        # Definitions and drawn areas can be shared between renders of the same diagram, so that
+        # drawn areas referencing definitions stay valid (see `_use_definition` and `draw`)
+        self.definitions = kwargs.get('definitions', {})
+        self.defined_keys = set()
+        self.fragments = kwargs.get('fragments')
+        # Links joining an address of an area view to an address of another one, as (start area
+        # view, start address, end area view, end address) tuples, drawn with `area_links_style`
+        self.area_links = kwargs.get('area_links', [])
+        self.area_links_style = kwargs.get('area_links_style')
+        self.section_index = self._index_sections(links.sections) if links is not None else {}
         self.links_sections = self._get_valid_linked_sections(links.sections) if links is not None else []
         self.file = file
         self.size = size
-        self.dwg = svgwrite.Drawing(file,
-                                    profile='full',
-                                    size=self.size
-                                    )
+        self.dwg = (kwargs.get('drawing_class') or Drawing)(file,
+                                                            profile='full',
+                                                            size=self.size
+                                                            )
+
+    def _index_sections(self, linked_sections):
+        """
+        Index the sections of every area whose id is referred to by a link, so that each link
+        resolves with a single lookup instead of scanning all the areas
+
+        :param linked_sections: List of sections or pair of sections to be linked
+        :return: Dictionary of id to list of (area index, position in area, section) tuples, in
+        area and position order
+        """
+        ids = set()
+        for linked_section in linked_sections:
+            ids.update(linked_section if isinstance(linked_section, list) else [linked_section])
+
+        index = {}
+        for area_index, area in enumerate(self.area_views):
+            for position, section in enumerate(area.sections.get_sections()):
+                if section.id in ids:
+                    index.setdefault(section.id, []).append((area_index, position, section))
+        return index
 
     def _get_valid_linked_sections(self, linked_sections):
         """
@@ -43,63 +74,47 @@ class MapRender:
         :param linked_sections: List of sections or pair of sections to be linked
         :return: List of valid (start, end) addresses for sections
         """
-
+        index = self.section_index
         l_sections = []
 
-        # Iterate through all linked sections
         for linked_section in linked_sections:
-            appended = False
-            multi_section = False
-
             # Check if we are dealing with a link for a single section or for many of them.
             # That is, user passed a string or a list of two strings
-            if isinstance(linked_section, list):
-                multi_section = True
-
-            # Iterate through all available areas checking if this is a valid link: i.e, the
-            # starting and ending addresses of the linked section/s is visible and available
-            # inside of a single area
-            for area in self.area_views:
-                start = None
-                end = None
-
-                # Exit loop if we found that the link is valid
-                if appended:
-                    break
-
-                for section in area.sections.get_sections():
-                    # If single section, the start and end address of the linked section equals
-                    # those of the section
-                    if not multi_section:
-                        if section.id == linked_section:
-                            l_sections.append([section.address, section.address + section.size])
-                            appended = True
-                            break
-                    # If multiple section, the start and end address of the linked section are the
-                    # start of the first provided section and the end of the second provided section
-                    # respectively
-                    else:
-                        if section.id == linked_section[0]:
-                            start = section.address
-                        elif section.id == linked_section[1]:
-                            end = section.address + section.size
-
-                        # If before finishing the iteration on this area, we found a valid start and
-                        # end address, we can append this linked section to the list
-                        if start is not None and end is not None:
-                            l_sections.append([start, end])
-                            appended = True
-                            break
-
-                # If we finish iterating the area, and we have a valid start (or end) address but
-                # the section was not appended, means that the other end of the section is at
-                # another area, and that is not valid
-                if multi_section and not appended and (start is not None or end is not None):
+            if not isinstance(linked_section, list):
+                # The start and end address of the linked section equals those of the first
+                # section with that id, at the first area showing it
+                entries = index.get(linked_section)
+                if entries:
+                    section = entries[0][2]
+                    l_sections.append([section.address, section.address + section.size])
+                continue
+
+            # If multiple section, the start and end address of the linked section are the start
+            # of the first provided section and the end of the second provided section
+            # respectively, which must be found at the same area
+            start_entries = index.get(linked_section[0], [])
+            end_entries = index.get(linked_section[1], []) \
+                if linked_section[1] != linked_section[0] else []
+
+            for area_index in sorted({entry[0] for entry in start_entries + end_entries}):
+                starts = [entry for entry in start_entries if entry[0] == area_index]
+                ends = [entry for entry in end_entries if entry[0] == area_index]
+
+                if not starts or not ends:
+                    # The other end of the section is at another area, and that is not valid
                     logger.warning("A multisection zoom region was specified for two sections"
                                    f"of different areas, which is not supported: "
                                    f"{linked_section[0]}, {linked_section[1]}")
                     break
 
+                # When a section id is repeated, the occurrences up to the position where both
+                # sections have been found are considered, and the last of them is taken
+                found = max(starts[0][1], ends[0][1])
+                start = [entry for entry in starts if entry[1] <= found][-1][2]
+                end = [entry for entry in ends if entry[1] <= found][-1][2]
+                l_sections.append([start.address, end.address + end.size])
+                break
+
         return l_sections
 
     def draw(self):
@@ -127,10 +142,12 @@ class MapRender:
 
                 subarea_group.add(self._make_main_frame(sub_area))
 
-                for section in sub_area.sections.get_sections():
+                sub_area.sections.layout(sub_area)
+                lod_threshold = sub_area.style.lod_threshold if sub_area.style is not None else 0
+                for section in sub_area.sections.aggregate_small_sections(sub_area, lod_threshold):
                     if section.is_hidden():
                         continue
-                    self._make_section(subarea_group, section, sub_area)
+                    self._make_section(subarea_group, section)
 
                 subarea_group.translate(sub_area.pos_x, sub_area.pos_y)
 
@@ -176,30 +193,67 @@ class MapRender:
                     global_labels.add(g)
             return global_labels
 
+        def _draw_growths(area_view) -> [svgwrite.container.Group]:
+            area_growths = []
+            for subarea in area_view.get_split_area_views():
+
+                area_growth = dwg.g()
+                for section in subarea.sections.get_sections():
+                    if section.is_hidden():
+                        continue
+                    area_growth.add(self._make_growth(section))
+
+                area_growth.translate(subarea.pos_x, subarea.pos_y)
+                area_growths.append(area_growth)
+            return area_growths
+
         def draw_growths() -> svgwrite.container.Group:
             # We need to do another pass once all areas are drawn in order to be able to properly
             # draw the growth arrows without the break areas hiding them. Also, as we do stuff
             # outside the loop where the areas are drawn, we loose the reference for translation,
             # and we have to manually translate the grows here
             for _area_view in self.area_views:
-                for subarea in _area_view.get_split_area_views():
-
-                    area_growth = dwg.g()
-                    for section in subarea.sections.get_sections():
-                        if section.is_hidden():
-                            continue
-                        area_growth.add(self._make_growth(section))
-
-                    area_growth.translate(subarea.pos_x, subarea.pos_y)
+                for area_growth in get_fragment(_area_view, 'growths', _draw_growths):
                     growths_group.add(area_growth)
             return growths_group
 
+        def get_fragment(area_view, kind, draw_fragment):
+            """
+            Draw a fragment of an area, or reuse the one drawn by a previous render of the
+            diagram, as long as its area view is reused, as it only changes when the
+            configuration, style or sections of the area do
+            """
+            if self.fragments is None:
+                return draw_fragment(area_view)
+            fragment = self.fragments.get((area_view, kind))
+            if fragment is None:
+                fragment = self.fragments[(area_view, kind)] = draw_fragment(area_view)
+            return fragment
+
         def draw_links() -> svgwrite.container.Group:
             lines_group = dwg.g()
             for address in self.links.addresses:
                 lines_group.add(self._make_link(address, self.links.style))
             return lines_group
 
+        def draw_area_links() -> svgwrite.container.Group:
+            area_links_group = dwg.g()
+            for start_area_view, start_address, end_area_view, end_address in self.area_links:
+                area_links_group.add(self._make_area_link(start_area_view, start_address,
+                                                          end_area_view, end_address,
+                                                          self.area_links_style))
+            return area_links_group
+
+        # Break glyphs are defined before anything is added to the document, so that streamed
+        # documents have their definitions at the start as well
+        for area_view in self.area_views:
+            for sub_area in area_view.get_split_area_views():
+                breaks = sub_area.sections.filter_breaks()
+                breaks.layout(sub_area)
+                for section in breaks.get_sections():
+                    if not section.is_hidden():
+                        self._make_break(section)
+
         dwg.add(dwg.rect(insert=(0, 0),
                          size=('100%', '100%'),
                          rx=None,
@@ -210,14 +264,20 @@ class MapRender:
 
         dwg.add(draw_section_links()) if self.links_sections is not None else None
         dwg.add(draw_links()) if self.links is not None else None
+        dwg.add(draw_area_links()) if self.area_links else None
 
         for area_view in self.area_views:
-            dwg.add(_draw_area(area_view))
+            dwg.add(get_fragment(area_view, 'area', _draw_area))
 
         dwg.add(draw_labels())
         dwg.add(draw_growths())
         dwg.save()
 
+        if self.fragments is not None:
+            area_views = set(self.area_views)
+            for key in [key for key in self.fragments if key[0] not in area_views]:
+                del self.fragments[key]
+
     def _make_title(self, area_view):
         title_pos_x = area_view.size_x / 2
         title_pos_y = -20
@@ -283,162 +343,177 @@ class MapRender:
                              stroke=section.style.stroke,
                              stroke_width=section.style.stroke_width)
 
-    def _make_break(self, section: Section) -> svgwrite.container.Group:
+    def _make_break(self, section: Section):
         """
         Make a break representation for a given section.
 
         Depending on the selected break type (at style/break_type), break can be wave (~), double
-        wave(≈), diagonal(/) or dots(...)
+        wave(≈), diagonal(/) or dots(...). The glyph of each break type is defined once per size
+        and style as a symbol, and placed at the section with a use element
         :param section: Section for which the break wants to be created
-        :return: SVG group container with the breaks graphics
+        :return: SVG use element placing the break glyph, or an empty group if the break type
+        is unknown
         """
-        group = self.dwg.g()
-        mid_point_x = (section.pos_x + section.size_x) / 2
-        mid_point_y = (section.pos_y + section.size_y) / 2
         style = section.style
+        breaks = {'/': self._make_break_diagonal,
+                  '≈': self._make_break_double_wave,
+                  '~': self._make_break_wave,
+                  '...': self._make_break_dots, }
+
+        make_break_glyph = breaks.get(style.break_type)
+        if make_break_glyph is None:
+            logger.warning(f"Unknown break type '{style.break_type}' for section {section.id}")
+            return self.dwg.g()
+
+        # Sizes only differing by rounding errors share their glyph
+        size = (round(section.size_x, 2), round(section.size_y, 2))
+
+        def _make_break_symbol():
+            symbol = self.dwg.symbol(overflow='visible')
+            for element in make_break_glyph(size, style):
+                symbol.add(element)
+            return symbol
+
+        return self._use_definition(('break', style.break_type, size, style.fill, style.stroke,
+                                     style.stroke_width, style.text_fill),
+                                    _make_break_symbol,
+                                    insert=(section.pos_x, section.pos_y))
+
+    @staticmethod
+    def _make_cosine_curve(start, end, offset, amplitude, period_scale):
+        """
+        Make the path commands of the curve (t + offset_x, offset_y + amplitude * cos(t /
+        period_scale)) for t going from start to end, as one cubic Bézier segment per quarter of
+        period, whose control points follow the slope of the curve at both ends of the segment
 
-        def _make_break_dots(_section: Section) -> svgwrite.container.Group:
-            """
-            Make a break representation using dot style
-
-            :param _section: Section for which the break wants to be created
-            :return: SVG group container with the breaks graphics
-            """
-            rectangle = self.dwg.rect((_section.pos_x, _section.pos_y),
-                                      (_section.size_x, _section.size_y))
+        :return: Path commands, starting by a move to the start of the curve
+        """
+        def point(t):
+            return offset[0] + t, offset[1] + amplitude * cos(t / period_scale)
+
+        def slope(t):
+            return -amplitude / period_scale * sin(t / period_scale)
+
+        quarter = pi / 2 * period_scale
+        steps = [start]
+        step = (floor(start / quarter) + 1) * quarter
+        while step < end:
+            steps.append(step)
+            step += quarter
+        steps.append(end)
+
+        commands = ['M{},{}'.format(*(round(value, 2) for value in point(start)))]
+        for t_0, t_1 in pairwise(steps):
+            third = (t_1 - t_0) / 3
+            (x_0, y_0), (x_1, y_1) = point(t_0), point(t_1)
+            control_points = [(x_0 + third, y_0 + third * slope(t_0)),
+                              (x_1 - third, y_1 - third * slope(t_1)),
+                              (x_1, y_1)]
+            commands.append('C' + ' '.join(f'{round(x, 2)},{round(y, 2)}'
+                                           for x, y in control_points))
+        return commands
+
+    @staticmethod
+    def _make_lines(points, close=False, move=True):
+        """
+        Make the path commands of the straight lines joining the given points
 
-            rectangle.fill(style.fill)
-            rectangle.stroke(style.stroke, width=style.stroke_width)
+        :param points: Points to join
+        :param close: Whether to close the path back to its first point
+        :param move: Whether to move to the first point, or to join it to the current point
+        """
+        commands = [f'{"L" if index or not move else "M"}{round(x, 2)},{round(y, 2)}'
+                    for index, (x, y) in enumerate(points)]
+        if close:
+            commands.append('Z')
+        return commands
 
-            group.add(rectangle)
+    def _make_break_dots(self, size, style):
+        """
+        Make the elements of a break glyph using dot style
 
-            points_list = [
-                (mid_point_x, mid_point_y),
-                (mid_point_x, mid_point_y + 12),
-                (mid_point_x, mid_point_y - 12),
-            ]
+        :param size: Width and height of the break section
+        :param style: Style of the break section
+        :return: List of SVG elements drawing the break, relative to the break section
+        """
+        mid_point_x, mid_point_y = size[0] / 2, size[1] / 2
+        rectangle = self.dwg.rect((0, 0), size)
+        rectangle.fill(style.fill)
+        rectangle.stroke(style.stroke, width=style.stroke_width)
 
-            for points_set in points_list:
-                group.add(self.dwg.circle(points_set, 3, fill=style.text_fill))
+        return [rectangle] + [self.dwg.circle((mid_point_x, mid_point_y + shift), 3,
+                                              fill=style.text_fill)
+                              for shift in (0, 12, -12)]
 
-            return group
+    def _make_break_wave(self, size, style):
+        """
+        Make the elements of a break glyph using wave style
 
-        def _make_break_wave(_section: Section) -> svgwrite.container.Group:
-            """
-            Make a break representation using wave style
+        :param size: Width and height of the break section
+        :param style: Style of the break section
+        :return: List of SVG elements drawing the break, relative to the break section
+        """
+        width, height = size
+        mid_point_y = height / 2
+        commands = []
+        for shift, side_y, edge_y in ((-5, height * 2 / 5, 0), (5, height * 3 / 5, height)):
+            commands.extend(self._make_cosine_curve(0, width, (0, mid_point_y + shift), 2, 24))
+            commands.extend(self._make_lines([(width, side_y), (width, edge_y), (0, edge_y)],
+                                             close=True, move=False))
+
+        return [self.dwg.path(' '.join(commands),
+                              stroke=style.stroke,
+                              stroke_width=style.stroke_width,
+                              fill=style.fill)]
+
+    def _make_break_double_wave(self, size, style):
+        """
+        Make the elements of a break glyph using double wave style
 
-            :param _section: Section for which the break wants to be created
-            :return: SVG group container with the breaks graphics
-            """
-            wave_len = _section.size_x + 1
-            shifts = [(-5, 2/5, 0), (5, 3 / 5, _section.size_y), ]
-
-            for shift in shifts:
-                points = [(i, mid_point_y + shift[0] + 2 * cos(i / 24)) for i in range(wave_len)]
-                points.extend(
-                    [
-                        (_section.pos_x + _section.size_x,
-                         (_section.pos_y + _section.size_y) * shift[1]),
-                        (_section.pos_x + _section.size_x, _section.pos_y + shift[2]),
-                        (_section.pos_x, _section.pos_y + shift[2]),
-                        (_section.pos_x, mid_point_y + shift[0] + 2 * cos(_section.pos_x / 24)),
-                    ]
-                )
-
-                group.add(self.dwg.polyline(points,
-                                            stroke=style.stroke,
-                                            stroke_width=style.stroke_width,
-                                            fill=style.fill))
-
-            return group
-
-        def _make_break_double_wave(_section: Section) -> svgwrite.container.Group:
-            """
-            Make a break representation using double wave style
+        :param size: Width and height of the break section
+        :param style: Style of the break section
+        :return: List of SVG elements drawing the break, relative to the break section
+        """
+        width, height = size
+        mid_point_y = height / 2
+        commands = self._make_lines([(0, height * 2 / 5), (0, 0), (width, 0),
+                                     (width, height * 2 / 5)])
+        commands.extend(self._make_lines([(0, height * 3 / 5), (0, height), (width, height),
+                                          (width, height * 3 / 5)]))
+
+        wave_length = 20
+        for shift_x, shift_y in ((0, -5), (0, 5), (width, -5), (width, 5)):
+            commands.extend(self._make_cosine_curve(0, wave_length - 1,
+                                                    (shift_x - wave_length / 2,
+                                                     mid_point_y + shift_y),
+                                                    1, 2))
+
+        rectangle = self.dwg.rect((0, 0), size)
+        rectangle.fill(style.fill)
+        return [rectangle, self.dwg.path(' '.join(commands),
+                                         stroke=style.stroke,
+                                         stroke_width=style.stroke_width,
+                                         fill='none')]
 
-            :param _section: Section for which the break wants to be created
-            :return: SVG group container with the breaks graphics
-            """
-            points_list = [[
-                (_section.pos_x, (_section.pos_y + _section.size_y) * 2 / 5),
-                (_section.pos_x, _section.pos_y),
-                (_section.pos_x + _section.size_x, _section.pos_y),
-                (_section.pos_x + _section.size_x, (_section.pos_y + _section.size_y) * 2 / 5),
-            ],
-                [
-                    (_section.pos_x, (_section.pos_y + _section.size_y) * 3 / 5),
-                    (_section.pos_x, _section.pos_y + _section.size_y),
-                    (_section.pos_x + _section.size_x, _section.pos_y + _section.size_y),
-                    (_section.pos_x + _section.size_x, (_section.pos_y + _section.size_y) * 3 / 5),
-                ]
-            ]
-
-            rectangle = self.dwg.rect((_section.pos_x, _section.pos_y),
-                                      (_section.size_x, _section.size_y))
-            rectangle.fill(section.style.fill)
-            group.add(rectangle)
-
-            for points_set in points_list:
-                group.add(self.dwg.polyline(points_set,
-                                            stroke=style.stroke,
-                                            stroke_width=style.stroke_width,
-                                            fill='none'))
-            wave_length = 20
-            shifts = [(0, -5),
-                      (0, +5),
-                      (_section.size_x, -5),
-                      (_section.size_x, +5),
-                      ]
-
-            for shift in shifts:
-                points = [(i - wave_length / 2 + shift[0], mid_point_y + shift[1] + cos(i / 2))
-                          for i in range(wave_length)]
-
-                group.add(self.dwg.polyline(points,
-                                            stroke=style.stroke,
-                                            stroke_width=style.stroke_width,
-                                            fill='none'))
-
-            return group
-
-        def _make_break_diagonal(_section: Section) -> svgwrite.container.Group:
-            """
-            Make a break representation using diagonal style
+    def _make_break_diagonal(self, size, style):
+        """
+        Make the elements of a break glyph using diagonal style
 
-            :param _section: Section for which the break wants to be created
-            :return: SVG group container with the breaks graphics
-            """
-            points_list = [[(_section.pos_x, _section.pos_y),
-                            (_section.pos_x + _section.size_x, _section.pos_y),
-                            (_section.pos_x + _section.size_x,
-                             (_section.pos_y + _section.size_y) * 3 / 10),
-                            (_section.pos_x, (_section.pos_y + _section.size_y) * 5 / 10),
-                            (_section.pos_x, _section.pos_y)
-                            ], [(_section.pos_x, _section.pos_y + _section.size_y),
-                                (_section.pos_x + _section.size_x,
-                                 _section.pos_y + _section.size_y),
-                                (_section.pos_x + _section.size_x,
-                                 (_section.pos_y + _section.size_y) * 5 / 10),
-                                (_section.pos_x, (_section.pos_y + _section.size_y) * 7 / 10),
-                                (_section.pos_x, _section.pos_y + _section.size_y),
-                                ]]
-
-            for points_set in points_list:
-                group.add(self.dwg.polyline(points_set,
-                                            stroke=style.stroke,
-                                            stroke_width=style.stroke_width,
-                                            fill=style.fill))
-
-            return group
-
-        breaks = [('/', _make_break_diagonal),
-                  ('≈', _make_break_double_wave),
-                  ('~', _make_break_wave),
-                  ('...', _make_break_dots), ]
-
-        for _break in breaks:
-            if style.break_type == _break[0]:
-                return _break[1](section)
+        :param size: Width and height of the break section
+        :param style: Style of the break section
+        :return: List of SVG elements drawing the break, relative to the break section
+        """
+        width, height = size
+        commands = self._make_lines([(0, 0), (width, 0), (width, height * 3 / 10),
+                                     (0, height * 5 / 10)], close=True)
+        commands.extend(self._make_lines([(0, height), (width, height),
+                                          (width, height * 5 / 10), (0, height * 7 / 10)],
+                                         close=True))
+
+        return [self.dwg.path(' '.join(commands),
+                              stroke=style.stroke,
+                              stroke_width=style.stroke_width,
+                              fill=style.fill)]
 
     def _make_text(self,
                    text,
@@ -489,12 +564,7 @@ class MapRender:
                                anchor='start',
                                style=section.style)
 
-    def _make_section(self, group, section: Section, area_view):
-        section.size_x = area_view.size_x
-        section.size_y = area_view.to_pixels(section.size)
-        section.pos_y = area_view.to_pixels(area_view.end_address - section.size - section.address)
-        section.pos_x = 0
-
+    def _make_section(self, group, section: Section):
         if section.is_break():
             group.add(self._make_break(section))
         else:
@@ -528,23 +598,10 @@ class MapRender:
 
     def _make_poly(self, area_view, start_address, end_address, style):
 
-        def find_right_subarea_view(address, area):
-            """
-            Given an area, find the subarea where the provided address is
-
-            :param address: Address to look for
-            :param area: Area that contains the subarea to be found
-            :return: Found subarea, if not found, parent area
-            """
-            for subarea in area.get_split_area_views():
-                if subarea.start_address <= address <= subarea.end_address:
-                    return subarea
-            return area
-
         points = []
 
-        end_subarea = find_right_subarea_view(end_address, area_view)
-        start_subarea = find_right_subarea_view(start_address, area_view)
+        end_subarea = area_view.find_split_area_view(end_address)
+        start_subarea = area_view.find_split_area_view(start_address)
 
         _reversed = self._get_points_for_address(end_address, end_subarea)
         _reversed.reverse()
@@ -567,25 +624,54 @@ class MapRender:
         else:
             angle = 180
 
-        arrow_head_width = 5 * label.style.weight
-        arrow_head_height = 10 * label.style.weight
-        group = self.dwg.g()
-        points_list = [(0, 0 - arrow_head_height),
-                       (0 - arrow_head_width, 0 - arrow_head_height),
-                       (0, 0),
-                       (0 + arrow_head_width, 0 - arrow_head_height),
-                       (0, 0 - arrow_head_height),
-                       ]
-
-        poly = self.dwg.polyline(points_list,
-                                 stroke=label.style.stroke,
-                                 stroke_width=1,
-                                 fill=label.style.stroke)
-        poly.rotate(angle, center=(0, 0))
-        group.add(poly)
+        def _make_arrow_head_poly():
+            arrow_head_width = 5 * label.style.weight
+            arrow_head_height = 10 * label.style.weight
+            points_list = [(0, 0 - arrow_head_height),
+                           (0 - arrow_head_width, 0 - arrow_head_height),
+                           (0, 0),
+                           (0 + arrow_head_width, 0 - arrow_head_height),
+                           (0, 0 - arrow_head_height),
+                           ]
+
+            poly = self.dwg.polyline(points_list,
+                                     stroke=label.style.stroke,
+                                     stroke_width=1,
+                                     fill=label.style.stroke)
+            poly.rotate(angle, center=(0, 0))
+            return poly
+
+        if self.compact:
+            return self._use_definition(('arrow-head', angle, label.style.weight,
+                                         label.style.stroke),
+                                        _make_arrow_head_poly)
 
+        group = self.dwg.g()
+        group.add(_make_arrow_head_poly())
         return group
 
+    def _use_definition(self, key, make_element, **extra):
+        """
+        Get a reference to an element defined once at the definitions of the document
+
+        Definitions keep their element and id across the renders sharing them, and are added to
+        the document of every render using them
+
+        :param key: Tuple identifying the element, starting with its kind
+        :param make_element: Function making the element, only called the first time it is used
+        :param extra: Additional arguments of the use element, such as its insert point
+        :return: SVG use element referencing the definition
+        """
+        element = self.definitions.get(key)
+        if element is None:
+            definition_id = f'{key[0]}-{len(self.definitions)}'
+            element = self.definitions[key] = make_element()
+            element['id'] = definition_id
+        if key not in self.defined_keys:
+            self.defined_keys.add(key)
+            self.dwg.defs.add(element)
+        return self.dwg.use(f"#{element['id']}", **extra)
+
     def _make_label(self, label, area_view):
         line_label_spacer = 3
         g = self.dwg.g()
@@ -677,3 +763,32 @@ class MapRender:
                 hlines.add(_make_line(x1=points[2][0], y1=points[2][1],
                                       x2=points[3][0], y2=points[3][1]))
         return hlines
+
+    def _make_area_link(self, start_area_view, start_address, end_area_view, end_address, style):
+        """
+        Make a line joining an address at the right side of an area view to an address at the
+        left side of another area view
+
+        :param start_area_view: Area view where the line starts
+        :param start_address: Address where the line starts
+        :param end_area_view: Area view where the line ends
+        :param end_address: Address where the line ends
+        :param style: Style of the line
+        :return: SVG polyline joining both addresses
+        """
+        start_subarea = start_area_view.find_split_area_view(start_address)
+        end_subarea = end_area_view.find_split_area_view(end_address)
+
+        start_x = start_area_view.pos_x + start_area_view.size_x
+        start_y = start_subarea.pos_y + start_subarea.to_pixels_relative(start_address)
+        end_x = end_area_view.pos_x
+        end_y = end_subarea.pos_y + end_subarea.to_pixels_relative(end_address)
+
+        return self.dwg.polyline([(start_x, start_y),
+                                  (start_x + 30, start_y),
+                                  (end_x - 30, end_y),
+                                  (end_x, end_y)],
+                                 stroke=style.stroke,
+                                 stroke_width=style.stroke_width,
+                                 fill='none',
+                                 opacity=style.opacity)
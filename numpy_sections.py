@@ -0,0 +1,153 @@
+import numpy as np
+
+from section import Section
+from sections import Sections
+
+
+class NumpySections(Sections):
+    """
+    Sections backed by NumPy columns
+
+    Addresses, sizes and flag bits (see `Section.FLAGS`) of the sections are stored as NumPy
+    arrays, so that filters become boolean masks, aggregates and address lookups run as array
+    operations and the pixel layout of all the sections is computed with a single call to
+    `AreaView.to_pixels`. The `Section` objects remain the source of truth, and are only gathered
+    into a list when `sections` is read. Columns are rebuilt from them by `invalidate`
+    """
+    # Addresses and sizes fit in signed 64-bit integers for virtually every map file, keeping the
+    # layout arithmetic exact. Bigger values fall back to arrays of Python integers
+    INT64_MAX = np.iinfo(np.int64).max
+
+    def __init__(self, sections: [Section], columns=None, indexes=None):
+        super().__init__(sections)
+        self._source = sections
+        self._indexes = indexes
+        self._sections = sections if indexes is None else None
+        self.columns = columns if columns is not None else self._get_columns(sections)
+
+    @property
+    def sections(self) -> [Section]:
+        if self._sections is None:
+            source = self._source
+            self._sections = [source[index] for index in self._indexes.tolist()]
+        return self._sections
+
+    @sections.setter
+    def sections(self, sections: [Section]):
+        self._source = self._sections = sections
+        self._indexes = None
+        self.invalidate()
+
+    @classmethod
+    def _get_columns(cls, sections):
+        addresses = [section.address for section in sections]
+        sizes = [section.size for section in sections]
+        flags = np.fromiter((section.flag_bits for section in sections), dtype=np.uint8,
+                            count=len(sections))
+
+        fits = all(0 <= value <= cls.INT64_MAX >> 1 for value in addresses + sizes)
+        dtype = np.int64 if fits else object
+        return {'addresses': np.array(addresses, dtype=dtype),
+                'sizes': np.array(sizes, dtype=dtype),
+                'flags': flags}
+
+    def invalidate(self):
+        super().invalidate()
+        if getattr(self, 'columns', None) is not None:
+            self.columns = self._get_columns(self.sections)
+
+    def _filter(self, mask):
+        """
+        Get a lazy selection of the sections at which a boolean mask over the columns is set
+        """
+        indexes = np.flatnonzero(mask)
+        columns = {name: column[indexes] for name, column in self.columns.items()}
+        if self._indexes is not None and self._sections is None:
+            return NumpySections(self._source, columns, self._indexes[indexes])
+        return NumpySections(self.sections, columns, indexes)
+
+    def _copy(self):
+        """
+        Get a lazy selection of the same sections, sharing their columns and pending selection
+        """
+        if self._sections is None:
+            return NumpySections(self._source, self.columns, self._indexes)
+        return NumpySections(self._sections, self.columns)
+
+    def filter_size_min(self, size_bytes: int):
+        return self._copy() if size_bytes is None \
+            else self._filter(self.columns['sizes'] > size_bytes)
+
+    def filter_size_max(self, size_bytes: int):
+        return self._copy() if size_bytes is None \
+            else self._filter(self.columns['sizes'] < size_bytes)
+
+    def filter_address_max(self, address_bytes: int):
+        return self._copy() if address_bytes is None \
+            else self._filter(self.columns['addresses'] + self.columns['sizes'] <= address_bytes)
+
+    def filter_address_min(self, address_bytes: int):
+        return self._copy() if address_bytes is None \
+            else self._filter(self.columns['addresses'] >= address_bytes)
+
+    def filter_type(self, _type: str):
+        return self._copy() if _type is None \
+            else self._filter(np.fromiter((item.filter_type == _type for item in self.sections),
+                                          dtype=bool, count=len(self.sections)))
+
+    def filter_parent(self, parent: str):
+        return self._copy() if parent is None \
+            else self._filter(np.fromiter((item.filter_parent == parent
+                                           for item in self.sections),
+                                          dtype=bool, count=len(self.sections)))
+
+    def filter_breaks(self):
+        return self._filter(self.columns['flags'] & Section.BREAK != 0)
+
+    def is_break_section_group(self):
+        return bool(np.any(self.columns['flags'] & Section.BREAK))
+
+    @property
+    def highest_section(self) -> int:
+        return self._get_aggregate(
+            'highest_section',
+            lambda sections: sections[int(np.argmax(self.columns['addresses']))])
+
+    @property
+    def highest_memory(self) -> int:
+        return self._get_aggregate(
+            'highest_memory',
+            lambda _: int(np.max(self.columns['addresses'] + self.columns['sizes'])))
+
+    @property
+    def lowest_memory(self) -> int:
+        return self._get_aggregate('lowest_memory',
+                                   lambda _: int(np.min(self.columns['addresses'])))
+
+    @property
+    def lowest_size(self) -> int:
+        return self._get_aggregate('lowest_size', lambda _: int(np.min(self.columns['sizes'])))
+
+    def has_range(self, start_address: int, end_address: int) -> bool:
+        if self._starts is None:
+            order = np.argsort(self.columns['addresses'], kind='stable')
+            self._starts = self.columns['addresses'][order]
+            self._max_ends = np.maximum.accumulate(
+                (self.columns['addresses'] + self.columns['sizes'])[order])
+        count = int(np.searchsorted(self._starts, end_address, side='right'))
+        return count > 0 and bool(self._max_ends[count - 1] >= start_address)
+
+    def layout(self, area_view):
+        addresses = self.columns['addresses']
+        sizes = self.columns['sizes']
+        if area_view.end_address > self.INT64_MAX >> 1:
+            addresses, sizes = addresses.astype(object), sizes.astype(object)
+        sizes_y = np.asarray(area_view.to_pixels(sizes), dtype=float).tolist()
+        positions_y = np.asarray(area_view.to_pixels(area_view.end_address - sizes - addresses),
+                                 dtype=float).tolist()
+
+        for section, size_y, pos_y in zip(self.sections, sizes_y, positions_y):
+            section.size_x = area_view.size_x
+            section.size_y = size_y
+            section.pos_y = pos_y
+            section.pos_x = 0
@@ -0,0 +1,279 @@
+import logging
+import re
+from functools import lru_cache
+from math import cos, radians, sin
+
+from PIL import Image, ImageColor, ImageDraw, ImageFont
+
+from svg_stream import StreamingDrawing
+
+# The root logger logs DEBUG messages (see logger.py), which Pillow would fill with its own
+logging.getLogger('PIL').setLevel(logging.WARNING)
+
+IDENTITY = (1, 0, 0, 1, 0, 0)
+
+# Image.Resampling is only available from Pillow 9.1
+LANCZOS = getattr(Image, 'Resampling', Image).LANCZOS
+
+
+def _multiply(matrix, other):
+    """
+    Compose two affine matrices (a, b, c, d, e, f), mapping (x, y) to (a*x + c*y + e,
+    b*x + d*y + f). `other` is applied first
+    """
+    a, b, c, d, e, f = matrix
+    a2, b2, c2, d2, e2, f2 = other
+    return (a * a2 + c * b2, b * a2 + d * b2,
+            a * c2 + c * d2, b * c2 + d * d2,
+            a * e2 + c * f2 + e, b * e2 + d * f2 + f)
+
+
+def _apply(matrix, x, y):
+    a, b, c, d, e, f = matrix
+    return a * x + c * y + e, b * x + d * y + f
+
+
+@lru_cache(maxsize=None)
+def _parse_transform(transform):
+    """
+    Get the matrix of an SVG transform attribute made of translate and rotate operations
+    """
+    matrix = IDENTITY
+    for operation, arguments in re.findall(r'(\w+)\(([^)]*)\)', transform):
+        values = [float(value) for value in re.split(r'[\s,]+', arguments.strip())]
+        if operation == 'translate':
+            tx, ty = values[0], values[1] if len(values) > 1 else 0
+            matrix = _multiply(matrix, (1, 0, 0, 1, tx, ty))
+        elif operation == 'rotate':
+            angle = radians(values[0])
+            cx, cy = (values[1], values[2]) if len(values) > 2 else (0, 0)
+            rotation = (cos(angle), sin(angle), -sin(angle), cos(angle), 0, 0)
+            matrix = _multiply(matrix, (1, 0, 0, 1, cx, cy))
+            matrix = _multiply(matrix, rotation)
+            matrix = _multiply(matrix, (1, 0, 0, 1, -cx, -cy))
+    return matrix
+
+
+@lru_cache(maxsize=None)
+def _get_font(family, size):
+    for name in (family, f'{family}.ttf', 'DejaVuSans.ttf'):
+        try:
+            return ImageFont.truetype(name, size)
+        except OSError:
+            continue
+    try:
+        return ImageFont.load_default(size)
+    except TypeError:
+        # Pillow older than 10.1 only has a default bitmap font of a single size
+        return ImageFont.load_default()
+
+
+class RasterDrawing(StreamingDrawing):
+    """
+    Drawing rendering its elements to a Pillow image as soon as they are added to the document,
+    saved as a raster image (e.g. PNG) instead of an SVG file
+
+    Elements are built with the same API as `StreamingDrawing`, so that `MapRender` draws the
+    same layout. Only the subset of SVG produced by `MapRender` is rendered: groups, rects,
+    circles, lines, polylines, paths made of straight lines and cubic Bézier curves, texts, and
+    uses of symbols, with translate and rotate transforms and inherited presentation attributes.
+    The image is drawn at `supersampling` times its size and then scaled down, to smooth edges
+    """
+    PRESENTATION_ATTRIBUTES = ('fill', 'stroke', 'stroke-width', 'font-family', 'font-size',
+                               'text-anchor', 'alignment-baseline')
+    DEFAULT_STYLE = {'fill': 'black', 'stroke': 'none', 'stroke-width': 1,
+                     'font-family': 'Helvetica', 'font-size': 16, 'text-anchor': 'start',
+                     'alignment-baseline': 'baseline'}
+    TEXT_ANCHORS = {'start': 'l', 'middle': 'm', 'end': 'r'}
+    TEXT_BASELINES = {'middle': 'm', 'hanging': 't', 'baseline': 's'}
+    PATH_TOKEN = re.compile(r'[MLCZmlcz]|-?\d*\.?\d+(?:[eE][-+]?\d+)?')
+    CURVE_STEPS = 8
+
+    def __init__(self, filename='noname.png', size=('100%', '100%'), profile='full',
+                 supersampling=2, **extra):
+        super().__init__(filename, size, profile, **extra)
+        self.supersampling = supersampling
+        self.width, self.height = (int(float(value)) for value in size)
+        self.image = Image.new('RGB', (self.width * supersampling, self.height * supersampling),
+                               'white')
+        # Drawing in RGBA mode blends translucent colors over the image
+        self.draw = ImageDraw.Draw(self.image, 'RGBA')
+        self.base_matrix = (supersampling, 0, 0, supersampling, 0, 0)
+
+    def add(self, element):
+        """
+        Render an element, together with all its children, to the image
+        """
+        self._render(element, self.base_matrix, self.DEFAULT_STYLE)
+        return element
+
+    def save(self):
+        """
+        Scale the image down to the document size and write it to the output file
+        """
+        image = self.image
+        if self.supersampling != 1:
+            image = image.resize((self.width, self.height), LANCZOS)
+        image.save(self.filename)
+
+    def _render(self, element, matrix, style):
+        attributes = element.attribs
+        inherited = {name: attributes[name] for name in self.PRESENTATION_ATTRIBUTES
+                     if attributes.get(name) is not None}
+        if inherited:
+            style = {**style, **inherited}
+
+        transform = attributes.get('transform')
+        if transform:
+            matrix = _multiply(matrix, _parse_transform(transform))
+
+        render = getattr(self, f'_render_{element.name}', None)
+        if render is not None:
+            render(element, matrix, style)
+
+    def _render_children(self, element, matrix, style):
+        for child in element.elements:
+            self._render(child, matrix, style)
+
+    _render_g = _render_children
+    _render_symbol = _render_children
+
+    def _render_use(self, element, matrix, style):
+        href = element.attribs.get('xlink:href', '').lstrip('#')
+        for definition in self.defs.elements:
+            if definition.attribs.get('id') == href:
+                offset = (1, 0, 0, 1, self._length(element.attribs.get('x', 0), self.width),
+                          self._length(element.attribs.get('y', 0), self.height))
+                self._render(definition, _multiply(matrix, offset), style)
+                return
+
+    def _color(self, color, element):
+        """
+        Get the RGBA color of a paint, applying the opacity of the element. None for no paint
+        """
+        if color is None or color == 'none':
+            return None
+        red, green, blue = ImageColor.getrgb(str(color))[:3]
+        opacity = float(element.attribs.get('opacity', 1))
+        return red, green, blue, round(255 * opacity)
+
+    def _stroke_width(self, style, matrix):
+        width = float(style['stroke-width']) * abs(matrix[0] or matrix[1])
+        return max(1, round(width)) if width > 0 else 0
+
+    @staticmethod
+    def _length(value, reference):
+        value = str(value)
+        if value.endswith('%'):
+            return float(value[:-1]) * reference / 100
+        return float(value.rstrip('px'))
+
+    def _draw_shape(self, subpaths, element, matrix, style):
+        """
+        Fill and stroke a shape made of one or more subpaths, given as (points, closed) pairs in
+        user coordinates
+        """
+        subpaths = [([_apply(matrix, x, y) for x, y in points], closed)
+                    for points, closed in subpaths if points]
+
+        fill = self._color(style['fill'], element)
+        if fill is not None:
+            for points, _ in subpaths:
+                if len(points) > 2:
+                    self.draw.polygon(points, fill=fill)
+
+        stroke = self._color(style['stroke'], element)
+        width = self._stroke_width(style, matrix)
+        if stroke is not None and width:
+            for points, closed in subpaths:
+                self.draw.line(points + points[:1] if closed else points, fill=stroke,
+                               width=width, joint='curve')
+
+    def _render_rect(self, element, matrix, style):
+        attributes = element.attribs
+        x = self._length(attributes.get('x', 0), self.width)
+        y = self._length(attributes.get('y', 0), self.height)
+        width = self._length(attributes['width'], self.width)
+        height = self._length(attributes['height'], self.height)
+        self._draw_shape([([(x, y), (x + width, y), (x + width, y + height), (x, y + height)],
+                           True)], element, matrix, style)
+
+    def _render_circle(self, element, matrix, style):
+        attributes = element.attribs
+        cx, cy = _apply(matrix, float(attributes['cx']), float(attributes['cy']))
+        radius = float(attributes['r']) * abs(matrix[0] or matrix[1])
+        self.draw.ellipse((cx - radius, cy - radius, cx + radius, cy + radius),
+                          fill=self._color(style['fill'], element),
+                          outline=self._color(style['stroke'], element),
+                          width=self._stroke_width(style, matrix))
+
+    def _render_line(self, element, matrix, style):
+        attributes = element.attribs
+        self._draw_shape([([(float(attributes['x1']), float(attributes['y1'])),
+                            (float(attributes['x2']), float(attributes['y2']))], False)],
+                         element, matrix, style)
+
+    def _render_polyline(self, element, matrix, style):
+        points = [tuple(float(value) for value in point.split(','))
+                  for point in element.attribs['points'].split()]
+        self._draw_shape([(points, element.name == 'polygon')], element, matrix, style)
+
+    _render_polygon = _render_polyline
+
+    def _render_path(self, element, matrix, style):
+        subpaths = []
+        points = []
+        closed = False
+        tokens = self.PATH_TOKEN.findall(element.attribs['d'])
+        index = 0
+        command = 'M'
+        while index < len(tokens):
+            if tokens[index].isalpha():
+                command = tokens[index].upper()
+                index += 1
+                if command == 'Z':
+                    closed = True
+                    continue
+
+            if command == 'M':
+                subpaths.append((points, closed))
+                points, closed = [], False
+                points.append((float(tokens[index]), float(tokens[index + 1])))
+                index += 2
+                # Coordinates following a move are lines
+                command = 'L'
+            elif command == 'L':
+                points.append((float(tokens[index]), float(tokens[index + 1])))
+                index += 2
+            elif command == 'C':
+                x0, y0 = points[-1]
+                x1, y1, x2, y2, x3, y3 = (float(value) for value in tokens[index:index + 6])
+                index += 6
+                for step in range(1, self.CURVE_STEPS + 1):
+                    t = step / self.CURVE_STEPS
+                    u = 1 - t
+                    points.append((u ** 3 * x0 + 3 * u * u * t * x1 + 3 * u * t * t * x2 +
+                                   t ** 3 * x3,
+                                   u ** 3 * y0 + 3 * u * u * t * y1 + 3 * u * t * t * y2 +
+                                   t ** 3 * y3))
+            else:
+                index += 1
+        subpaths.append((points, closed))
+        self._draw_shape(subpaths, element, matrix, style)
+
+    def _render_text(self, element, matrix, style):
+        fill = self._color(style['fill'], element)
+        if not element.text or fill is None:
+            return
+        attributes = element.attribs
+        x, y = _apply(matrix, float(attributes.get('x', 0)), float(attributes.get('y', 0)))
+        scale = abs(matrix[0] or matrix[1])
+        font = _get_font(str(style['font-family']),
+                         max(1, round(self._length(style['font-size'], 0) * scale)))
+        anchor = self.TEXT_ANCHORS.get(style['text-anchor'], 'l') + \
+            self.TEXT_BASELINES.get(style['alignment-baseline'], 's')
+
+        stroke = self._color(style['stroke'], element)
+        stroke_width = self._stroke_width(style, matrix) if stroke is not None else 0
+        self.draw.text((x, y), element.text, font=font, anchor=anchor,
+                       fill=fill, stroke_width=stroke_width, stroke_fill=stroke)
@@ -1,3 +1,6 @@
+import sys
+
+from logger import logger
 from style import Style
 
 
@@ -5,7 +8,15 @@ class Section:
     """
     Holds logical and graphical information for a given section, as well as other properties such as
     style, visibility, type, etc...
+
+    Sections use a slotted layout, as maps can hold hundreds of thousands of them. Flags are kept
+    as a bitmask (see `FLAGS`) and only converted from and to their string form when sections
+    are read or written. Ids and parents are interned, and every section shares the same empty
+    style until one is assigned to it
     """
+    __slots__ = ('type', 'parent', 'size', 'address', 'id', 'name', 'size_x', 'size_y', 'pos_x',
+                 'pos_y', 'style', 'flag_bits')
+
     size: int
     address: int
     id: str
@@ -15,30 +26,82 @@ class Section:
     pos_y: int
     label_offset: int = 10
     style: Style
+    flag_bits: int
+
+    GROWS_UP = 1
+    GROWS_DOWN = 2
+    BREAK = 4
+    HIDDEN = 8
+
+    # String form of each flag bit, as found at map and configuration files
+    FLAGS = {'grows-up': GROWS_UP, 'grows-down': GROWS_DOWN, 'break': BREAK, 'hidden': HIDDEN}
+
+    DEFAULT_STYLE = Style()
 
-    def __init__(self, size, address, id, _type, parent, flags=[], name=None):
+    def __init__(self, size, address, id, _type, parent, flags=0, name=None):
         self.type = _type
-        self.parent = parent
+        self.parent = sys.intern(parent) if isinstance(parent, str) else parent
         self.size = size
         self.address = address
-        self.id = id
+        self.id = sys.intern(id) if isinstance(id, str) else id
         self.name = name
         self.size_y = 0
         self.size_x = 0
-        self.style = Style()
-        self.flags = flags
+        self.style = self.DEFAULT_STYLE
+        self.flag_bits = flags if isinstance(flags, int) else self.parse_flags(flags)
+
+    @classmethod
+    def parse_flags(cls, flags) -> int:
+        """
+        Convert flags from their string form to a bitmask
+
+        :param flags: Either a list of flag names or a single string of comma separated flag
+        names, as found at map and configuration files. None stands for no flags
+        :return: Bitmask of the flags
+        """
+        if flags is None:
+            return 0
+        if isinstance(flags, str):
+            flags = flags.split(',')
+
+        bits = 0
+        for flag in flags:
+            flag = str(flag).strip()
+            if not flag:
+                continue
+            bit = cls.FLAGS.get(flag)
+            if bit is None:
+                logger.warning(f"Unknown section flag '{flag}' has been ignored")
+                continue
+            bits |= bit
+        return bits
+
+    @property
+    def flags(self) -> [str]:
+        return [flag for flag, bit in self.FLAGS.items() if self.flag_bits & bit]
+
+    @flags.setter
+    def flags(self, flags):
+        self.flag_bits = self.parse_flags(flags)
+
+    def add_flags(self, flags):
+        """
+        Add flags to the ones of the section
+        :param flags: Flags in any of the forms accepted by `parse_flags`
+        """
+        self.flag_bits |= self.parse_flags(flags)
 
     def is_grow_up(self):
-        return 'grows-up' in self.flags
+        return bool(self.flag_bits & self.GROWS_UP)
 
     def is_grow_down(self):
-        return 'grows-down' in self.flags
+        return bool(self.flag_bits & self.GROWS_DOWN)
 
     def is_break(self):
-        return 'break' in self.flags
+        return bool(self.flag_bits & self.BREAK)
 
     def is_hidden(self):
-        return 'hidden' in self.flags
+        return bool(self.flag_bits & self.HIDDEN)
 
     def _should_element_be_hidden(self, attribute):
         return True if str(attribute) in ['True', 'yes'] \
@@ -73,3 +136,36 @@ class Section:
     @property
     def name_label_pos_y(self):
         return self.pos_y + (self.size_y / 2)
+
+
+class SectionView(Section):
+    """
+    Area-local view of a section, sharing its parsed record
+
+    A view starts holding none of the section fields, and reads them from the viewed section. Any
+    field assigned to the view, such as the ones overridden by the configuration of an area or
+    its layout, is stored at the view only, so that areas showing the same sections never modify
+    each other's, without copying the sections they do not modify
+    """
+    __slots__ = ('base',)
+
+    def __init__(self, base: Section):
+        self.base = base
+        self.size_y = 0
+        self.size_x = 0
+
+    def __getattr__(self, name):
+        # Only reached for the fields not assigned to the view yet
+        return getattr(self.base, name)
+
+
+class SymbolSection(Section):
+    """
+    Section of type `symbol`, built from an entry of a `SymbolTable`, which also holds the object
+    file contributing the symbol
+    """
+    __slots__ = ('object',)
+
+    def __init__(self, size, address, id, parent, _object=None):
+        super().__init__(size=size, address=address, id=id, _type='symbol', parent=parent)
+        self.object = _object
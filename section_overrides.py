@@ -0,0 +1,99 @@
+import fnmatch
+import re
+
+from helpers import safe_element_dict_get
+from logger import logger
+from style import Style
+
+
+class SectionOverrides:
+    """
+    Compiled `sections` rules of an area configuration, used to override the properties of the
+    sections they name
+
+    Rules are compiled once per area: plain names go to an id -> rules table, and names holding
+    glob wildcards (`*`, `?`, `[`) or prefixed with `re:` (regular expression) are combined into a
+    single pattern that discards non-matching ids in one match. The rules applying to an id are
+    resolved once and reused for every section with that id
+    """
+    REGEX_PREFIX = 're:'
+    GLOB_CHARACTERS = '*?['
+
+    def __init__(self, rules):
+        self.rules = []
+        self.exact = {}
+        self.patterns = []
+        self.matches = {}
+
+        if rules is None:
+            logger.warning("'sections' property is declared but is empty. Field has been ignored")
+            rules = []
+
+        for index, rule in enumerate(rules):
+            names = safe_element_dict_get(rule, 'names', [])
+            if names is None:
+                logger.warning(
+                    "'sections' property is declared but is empty. Field has been ignored")
+                names = []
+            elif isinstance(names, str):
+                names = [names]
+
+            self.rules.append((Style(style=safe_element_dict_get(rule, 'style')), rule))
+            for name in names:
+                name = str(name)
+                self.exact.setdefault(name, set()).add(index)
+                if name.startswith(self.REGEX_PREFIX):
+                    self._add_pattern(name[len(self.REGEX_PREFIX):], index)
+                elif any(character in name for character in self.GLOB_CHARACTERS):
+                    self._add_pattern(fnmatch.translate(name), index)
+
+        try:
+            self.any_pattern = re.compile('|'.join(f'(?:{pattern.pattern})'
+                                                   for pattern, _ in self.patterns))
+        except re.error:
+            # Patterns that cannot be combined (e.g. using inline flags) are tried one by one
+            self.any_pattern = None
+
+    def _add_pattern(self, pattern, index):
+        try:
+            self.patterns.append((re.compile(pattern), index))
+        except re.error as error:
+            logger.warning(f"Invalid section name pattern '{pattern}' has been ignored: {error}")
+
+    def get_rules(self, section_id):
+        """
+        Get the rules applying to a section id, in the order they are declared
+
+        :param section_id: Id of the section
+        :return: Tuple of (style, rule) pairs
+        """
+        rules = self.matches.get(section_id)
+        if rules is None:
+            name = str(section_id)
+            indexes = set(self.exact.get(name, ()))
+            if self.patterns and (self.any_pattern is None or self.any_pattern.fullmatch(name)):
+                indexes.update(index for pattern, index in self.patterns
+                               if pattern.fullmatch(name))
+            rules = self.matches[section_id] = tuple(self.rules[index]
+                                                     for index in sorted(indexes))
+        return rules
+
+    def apply(self, section, style):
+        """
+        Override the properties of a section with the rules applying to it
+
+        :param section: Section to modify
+        :param style: Style the section has if no rule modifies it
+        """
+        for rule_style, rule in self.get_rules(section.id):
+            style = style.override_properties_from(rule_style)
+            if 'address' in rule:
+                section.address = rule['address']
+            if 'type' in rule:
+                section.type = rule['type']
+            if 'size' in rule:
+                section.size = rule['size']
+            # As flags can be defined previously at map file, APPEND whatever is new
+            if rule.get('flags') is not None:
+                section.add_flags(rule['flags'])
+        section.style = style
@@ -1,3 +1,7 @@
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+
+from helpers import pairwise
 from section import Section
 
 
@@ -5,41 +9,101 @@ class Sections:
     """
     Provide methods and to select and filter sections according to their base address, size, parent,
     type,...
+
+    Filters are lazy: chaining them only records their predicates, and the resulting sections are
+    selected in a single pass over the source list the first time they are read. Aggregates such as
+    `highest_memory` are computed once and kept until `invalidate` is called
     """
-    sections: [Section] = []
+    def __init__(self, sections: [Section], predicates=()):
+        self._source = sections
+        self._predicates = tuple(predicates)
+        self._sections = None if self._predicates else sections
+        self._aggregates = {}
+        self._starts = None
+        self._max_ends = None
+
+    @property
+    def sections(self) -> [Section]:
+        if self._sections is None:
+            predicates = self._predicates
+            self._sections = [section for section in self._source
+                              if all(predicate(section) for predicate in predicates)]
+        return self._sections
 
-    def __init__(self, sections: [Section]):
-        self.sections = sections
+    @sections.setter
+    def sections(self, sections: [Section]):
+        self._source = self._sections = sections
+        self._predicates = ()
+        self.invalidate()
 
     def get_sections(self) -> [Section]:
         return self.sections
 
+    def _get_aggregate(self, name, compute):
+        if name not in self._aggregates:
+            self._aggregates[name] = compute(self.sections)
+        return self._aggregates[name]
+
     @property
     def highest_section(self) -> int:
-        return max(self.sections, key=lambda x: x.address)
+        return self._get_aggregate('highest_section',
+                                   lambda sections: max(sections, key=lambda x: x.address))
 
     @property
     def highest_address(self) -> int:
-        return max(self.sections, key=lambda x: x.address).address
+        return self.highest_section.address
 
     @property
     def highest_memory(self) -> int:
-        section = max(self.sections, key=lambda x: x.address + x.size)
-        return section.address + section.size
+        return self._get_aggregate('highest_memory',
+                                   lambda sections: max(x.address + x.size for x in sections))
 
     @property
     def lowest_memory(self) -> int:
-        return min(self.sections, key=lambda x: x.address).address
+        return self._get_aggregate('lowest_memory',
+                                   lambda sections: min(x.address for x in sections))
 
     @property
     def lowest_size(self) -> int:
-        return min(self.sections, key=lambda x: x.size).size
+        return self._get_aggregate('lowest_size', lambda sections: min(x.size for x in sections))
+
+    def _get_index(self):
+        """
+        Get the interval index of the sections, building it if needed
+
+        The index holds the start addresses of the sections in ascending order, and for each of
+        them the highest end address among the sections starting at or before it. The sections
+        starting at or before an address are found with a binary search, and one of them
+        reaches the address if the highest of their end addresses does
+
+        :return: Sorted start addresses and running maximum of the end addresses
+        """
+        if self._starts is None:
+            ordered = sorted(self.sections, key=lambda x: x.address)
+            self._starts = [section.address for section in ordered]
+            self._max_ends = list(accumulate((section.address + section.size
+                                              for section in ordered), max))
+        return self._starts, self._max_ends
+
+    def invalidate(self):
+        """
+        Drop the cached aggregates and interval index, which must be done whenever the address or
+        size of any of the sections changes
+        """
+        self._aggregates = {}
+        self._starts = None
+        self._max_ends = None
 
     def has_address(self, address: int) -> bool:
-        for section in self.sections:
-            if section.address <= address <= (section.address + section.size):
-                return True
-        return False
+        return self.has_range(address, address)
+
+    def has_range(self, start_address: int, end_address: int) -> bool:
+        """
+        Check whether any section overlaps the given address range, bounds included
+        """
+        starts, max_ends = self._get_index()
+        count = bisect_right(starts, end_address)
+        return count > 0 and max_ends[count - 1] >= start_address
 
     def is_break_section_group(self):
         for section in self.get_sections():
@@ -47,67 +111,171 @@ class Sections:
                 return True
         return False
 
+    def _filter(self, predicate):
+        """
+        Get a lazy selection of the sections matching a predicate on top of the current filters
+        """
+        if self._sections is not None:
+            return Sections(self._sections, (predicate,))
+        return Sections(self._source, self._predicates + (predicate,))
+
+    def _copy(self):
+        """
+        Get a lazy selection of the same sections, sharing the pending filters instead of
+        selecting the sections
+        """
+        if self._sections is not None:
+            return Sections(self._sections)
+        return Sections(self._source, self._predicates)
+
     def filter_size_min(self, size_bytes: int):
-        return Sections(self.sections) if size_bytes is None \
-            else Sections(list(filter(lambda item: item.size > size_bytes, self.sections)))
+        return self._copy() if size_bytes is None \
+            else self._filter(lambda item: item.size > size_bytes)
 
     def filter_size_max(self, size_bytes: int):
-        return Sections(self.sections) if size_bytes is None \
-            else Sections(list(filter(lambda item: item.size < size_bytes, self.sections)))
+        return self._copy() if size_bytes is None \
+            else self._filter(lambda item: item.size < size_bytes)
 
     def filter_address_max(self, address_bytes: int):
-        return Sections(self.sections) if address_bytes is None \
-            else Sections(list(filter(lambda item: (item.address + item.size)
-                                                   <= address_bytes, self.sections)))
+        return self._copy() if address_bytes is None \
+            else self._filter(lambda item: (item.address + item.size) <= address_bytes)
 
     def filter_address_min(self, address_bytes: int):
-        return Sections(self.sections) if address_bytes is None \
-            else Sections(list(filter(lambda item: item.address >= address_bytes, self.sections)))
+        return self._copy() if address_bytes is None \
+            else self._filter(lambda item: item.address >= address_bytes)
 
     def filter_type(self, _type: str):
-        return Sections(self.sections) if _type is None \
-            else Sections(list(filter(lambda item: item.filter_type == _type, self.sections)))
+        return self._copy() if _type is None \
+            else self._filter(lambda item: item.filter_type == _type)
 
     def filter_parent(self, parent: str):
-        return Sections(self.sections) if parent is None \
-            else Sections(list(filter(lambda item: item.filter_parent == parent, self.sections)))
+        return self._copy() if parent is None \
+            else self._filter(lambda item: item.filter_parent == parent)
 
     def filter_breaks(self):
-        return Sections(list(filter(lambda item: item.is_break(), self.sections)))
+        return self._filter(lambda item: item.is_break())
+
+    def layout(self, area_view):
+        """
+        Compute the size and position in pixels of every section inside the given area view
+
+        :param area_view: Area view the sections are drawn at
+        """
+        for section in self.sections:
+            self._layout_section(section, area_view)
+
+    @staticmethod
+    def _layout_section(section, area_view):
+        section.size_x = area_view.size_x
+        section.size_y = area_view.to_pixels(section.size)
+        section.pos_y = area_view.to_pixels(area_view.end_address - section.size - section.address)
+        section.pos_x = 0
+
+    def aggregate_small_sections(self, area_view, min_size_y) -> [Section]:
+        """
+        Get the sections to draw at an area view, merging runs of adjacent sections smaller than
+        `min_size_y` pixels into a single aggregate section named after the number of sections
+        and bytes it holds, so that the number of drawn sections is bounded by the height of the
+        area rather than by the number of sections. Sections must be laid out already
+
+        Only sections following each other both in the list and in memory, with gaps smaller than
+        `min_size_y` pixels between them, are merged, so that the drawing order is kept, and an
+        aggregate takes no more sections once it reaches `min_size_y` pixels. Break sections are
+        never merged, and hidden sections are passed through
+
+        :param area_view: Area view the sections are drawn at
+        :param min_size_y: Size in pixels below which sections are merged. None or 0 disables it
+        :return: List of sections to draw
+        """
+        if not min_size_y:
+            return self.sections
+
+        drawn = []
+        run = []
+
+        def close_run():
+            if len(run) == 1:
+                drawn.append(run[0])
+            elif run:
+                drawn.append(self._make_aggregate(run, area_view))
+            run.clear()
+
+        for section in self.sections:
+            if section.is_hidden():
+                drawn.append(section)
+                continue
+
+            if section.is_break() or section.size_y >= min_size_y:
+                close_run()
+                drawn.append(section)
+                continue
+
+            if run:
+                run_end = run[-1].address + run[-1].size
+                if section.address < run_end or \
+                        area_view.to_pixels(section.address - run_end) >= min_size_y:
+                    close_run()
+            run.append(section)
+            # Aggregates are closed once they are big enough to be seen, so that details are
+            # kept at the resolution given by the threshold
+            if area_view.to_pixels(section.address + section.size - run[0].address) >= min_size_y:
+                close_run()
+
+        close_run()
+        return drawn
+
+    @classmethod
+    def _make_aggregate(cls, run, area_view) -> Section:
+        """
+        Make the section standing for a run of adjacent sections, laid out at the given area view
+        """
+        address = run[0].address
+        size_bytes = sum(section.size for section in run)
+        aggregate = Section(size=run[-1].address + run[-1].size - address,
+                            address=address,
+                            id=f'{run[0].id}..{run[-1].id}',
+                            _type='aggregate',
+                            parent=run[0].parent,
+                            name=f'{len(run)} sections, {size_bytes} bytes')
+        aggregate.style = area_view.style
+        cls._layout_section(aggregate, area_view)
+        return aggregate
 
     def split_sections_around_breaks(self) -> []:
         """
         Split a Sections object into different Sections objects having a break section as delimiter
 
+        The address ranges between consecutive breaks are computed first, and then the sections
+        are placed into the ranges they fit in with a single pass. When the ranges are sorted, as
+        happens for breaks listed by address that do not overlap, the ranges of a section are
+        found with a binary search instead of trying them all
+
         :return: A list of Section objects
         """
-        split_sections = []
-        previous_break_end_address = self.lowest_memory
-
         breaks = self.filter_breaks().get_sections()
 
-        for _break in breaks:
-
-            # Section that covers from previous break till start of this break
-            # If it was the first break, will cover from begining of the whole area to this break.
-            # Only append if search returns more than 0 counts
-            s = Sections(sections=self.sections) \
-                .filter_address_max(_break.address) \
-                .filter_address_min(previous_break_end_address)
-            if len(s.get_sections()) > 0:
-                split_sections.append(s)
-
-            # This section covers the break itself
-            split_sections.append(Sections(sections=[_break]))
-            previous_break_end_address = _break.address + _break.size
-
-        # Section that covers from the last break end address to the end of the whole area. Only
-        # append if search returns more than 0 counts
-        last_group = Sections(sections=self.sections) \
-            .filter_address_max(self.highest_memory) \
-            .filter_address_min(previous_break_end_address)
-
-        if len(last_group.sections) > 0:
-            split_sections.append(last_group)
+        # Range before the first break, between every two breaks and after the last one
+        range_starts = [self.lowest_memory] + [_break.address + _break.size for _break in breaks]
+        range_ends = [_break.address for _break in breaks] + [self.highest_memory]
+        is_sorted = all(previous <= current for previous, current in pairwise(range_starts)) \
+            and all(previous <= current for previous, current in pairwise(range_ends))
+
+        groups = [[] for _ in range_starts]
+        for section in self.sections:
+            start = section.address
+            end = section.address + section.size
+            indexes = range(bisect_left(range_ends, end), bisect_right(range_starts, start)) \
+                if is_sorted else range(len(groups))
+            for index in indexes:
+                if range_starts[index] <= start and end <= range_ends[index]:
+                    groups[index].append(section)
+
+        split_sections = []
+        for index, group in enumerate(groups):
+            # Only append the groups that hold any section
+            if len(group) > 0:
+                split_sections.append(type(self)(group))
+            if index < len(breaks):
+                split_sections.append(type(self)([breaks[index]]))
 
         return split_sections
@@ -1,11 +1,24 @@
+from functools import lru_cache
+from weakref import WeakValueDictionary
+
+
 class Style:
     """
     Holds style for different rendering objects
+
+    Styles are immutable and hash-consed: building a style with the same properties as an
+    existing one returns that same object, and merging two styles returns a new style, cached by
+    the pair of merged styles. Objects with the same effective style thus share one instance.
+    The intern table only holds the styles still in use, and the merge cache keeps the most
+    recent merges, so that neither grows without bound over the renders of a long-lived process
     """
+    _interned = WeakValueDictionary()
+    _default = None
     # Non SVG
     background: str
     break_type: str
     break_size: int
+    lod_threshold: float
     growth_arrow_size: float
     growth_arrow_stroke: str
     growth_arrow_fill: str
@@ -30,27 +43,67 @@ class Style:
 
     weight: int
 
-    def __init__(self, style=None):
-        if style is not None:
-            for key, value in style.items():
-                setattr(self, key.replace('-', '_'), style.get(key, value))
+    def __new__(cls, style=None):
+        properties = {} if style is None else \
+            {key.replace('-', '_'): value for key, value in style.items()}
+        return cls._intern(properties)
+
+    @classmethod
+    def _intern(cls, properties):
+        """
+        Get the style holding the given properties, creating it only if it does not exist yet.
+        Value types are part of the key, so that e.g. `1` and `True` are told apart. Styles with
+        unhashable property values are not interned
+        """
+        try:
+            key = frozenset((name, type(value), value) for name, value in properties.items())
+            instance = cls._interned.get(key)
+        except TypeError:
+            key, instance = None, None
+
+        if instance is None:
+            instance = object.__new__(cls)
+            object.__setattr__(instance, '_properties', properties)
+            if key is not None:
+                cls._interned[key] = instance
+        return instance
+
+    def __getattr__(self, name):
+        try:
+            return self._properties[name]
+        except KeyError:
+            raise AttributeError(f"Style has no '{name}' property") from None
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Style objects are immutable, use override_properties_from instead")
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        return Style, (self._properties,)
 
     def override_properties_from(self, style):
         """
-        Modify self by adding additional members available at the provided style
+        Get the style resulting from adding to self the members available at the provided style.
+        Members set to None at the provided style are ignored
 
         :param style: Style whose members wants to be added
-        :return: New merged styl
+        :return: New merged style
         """
-        members = [attr for attr in dir(style) if
-                   not callable(getattr(style, attr)) and not attr.startswith("__") and getattr(
-                       style, attr) is not None]
-
-        for member in members:
-            value = getattr(style, member)
-            setattr(self, member, value)
+        return self._merge(self, style)
 
-        return self
+    @staticmethod
+    @lru_cache(maxsize=4096)
+    def _merge(base, style):
+        # Styles are interned, so that they are hashed and compared by identity
+        properties = dict(base._properties)
+        properties.update((name, value) for name, value in style._properties.items()
+                          if value is not None)
+        return Style._intern(properties)
 
     @staticmethod
     def get_default():
@@ -58,35 +111,29 @@ class Style:
         Get an initialized default Style instance
         :return: A default initialized Style instance
         """
-
-        default_style = Style()
-        default_style.break_type = '≈'
-        default_style.break_size = 20
-
-        default_style.growth_arrow_size = 1
-
-        default_style.background = 'white'
-        default_style.stroke = 'black'
-        default_style.stroke_width = 1
-        default_style.size = 2
-
-        default_style.font_size = 16
-        default_style.font_type = 'Helvetica'
-
-        default_style.weight = 1
-        default_style.opacity = 1
-
-        default_style.text_stroke = 'black'
-        default_style.text_fill = 'black'
-        default_style.text_stroke_width = 0
-
-        default_style.fill = 'lightgrey'
-        default_style.growth_arrow_fill = 'white'
-        default_style.growth_arrow_stroke = 'black'
-        default_style.stroke_dasharray = '3,2'
-        default_style.weight = 2
-        default_style.hide_size = 'auto'
-        default_style.hide_name = 'auto'
-        default_style.hide_address = 'auto'
-
-        return default_style
+        if Style._default is None:
+            Style._default = Style({
+                'break_type': '≈',
+                'break_size': 20,
+                'lod_threshold': 0,
+                'growth_arrow_size': 1,
+                'background': 'white',
+                'stroke': 'black',
+                'stroke_width': 1,
+                'size': 2,
+                'font_size': 16,
+                'font_type': 'Helvetica',
+                'opacity': 1,
+                'text_stroke': 'black',
+                'text_fill': 'black',
+                'text_stroke_width': 0,
+                'fill': 'lightgrey',
+                'growth_arrow_fill': 'white',
+                'growth_arrow_stroke': 'black',
+                'stroke_dasharray': '3,2',
+                'weight': 2,
+                'hide_size': 'auto',
+                'hide_name': 'auto',
+                'hide_address': 'auto',
+            })
+        return Style._default
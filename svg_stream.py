@@ -0,0 +1,331 @@
+import io
+import re
+from functools import lru_cache
+
+from svgwrite.utils import strlist
+from svgwrite.validator2 import get_validator
+
+
+@lru_cache(maxsize=None)
+def _attribute_name(key):
+    """
+    Convert a keyword argument name into an SVG attribute name, as svgwrite does: trailing '_'
+    are removed (`class_` -> `class`) and inner '_' are replaced by '-' (`stroke_width` ->
+    `stroke-width`)
+    """
+    return key.rstrip('_').replace('_', '-')
+
+
+def _escape_attribute(value):
+    if '&' in value:
+        value = value.replace('&', '&amp;')
+    if '<' in value:
+        value = value.replace('<', '&lt;')
+    if '>' in value:
+        value = value.replace('>', '&gt;')
+    if '"' in value:
+        value = value.replace('"', '&quot;')
+    if '\r' in value:
+        value = value.replace('\r', '&#13;')
+    if '\n' in value:
+        value = value.replace('\n', '&#10;')
+    if '\t' in value:
+        value = value.replace('\t', '&#09;')
+    return value
+
+
+def _escape_text(text):
+    if '&' in text:
+        text = text.replace('&', '&amp;')
+    if '<' in text:
+        text = text.replace('<', '&lt;')
+    if '>' in text:
+        text = text.replace('>', '&gt;')
+    return text
+
+
+class StreamElement:
+    """
+    SVG element of a `StreamingDrawing`, implementing the subset of the svgwrite element API
+    used by `MapRender`
+    """
+    __slots__ = ('name', 'attribs', 'elements', 'text')
+
+    def __init__(self, name, attributes=None, text=None, **extra):
+        self.name = name
+        self.attribs = {} if attributes is None else attributes
+        for key, value in extra.items():
+            self.attribs[_attribute_name(key)] = value
+        self.elements = []
+        self.text = text
+
+    def __getitem__(self, key):
+        return self.attribs[key]
+
+    def __setitem__(self, key, value):
+        self.attribs[key] = value
+
+    def add(self, element):
+        self.elements.append(element)
+        return element
+
+    def _add_transformation(self, transformation):
+        self.attribs['transform'] = \
+            f"{self.attribs.get('transform', '')} {transformation}".strip()
+
+    def translate(self, tx, ty=None):
+        self._add_transformation(f'translate({strlist([tx, ty])})')
+
+    def rotate(self, angle, center=None):
+        self._add_transformation(f'rotate({strlist([angle, center])})')
+
+    def fill(self, color=None, rule=None, opacity=None):
+        if color is not None:
+            self.attribs['fill'] = color
+        if rule is not None:
+            self.attribs['fill-rule'] = rule
+        if opacity is not None:
+            self.attribs['fill-opacity'] = opacity
+        return self
+
+    def stroke(self, color=None, width=None, opacity=None, linecap=None, linejoin=None,
+               miterlimit=None):
+        for name, value in (('stroke', color), ('stroke-width', width),
+                            ('stroke-opacity', opacity), ('stroke-linecap', linecap),
+                            ('stroke-linejoin', linejoin), ('stroke-miterlimit', miterlimit)):
+            if value is not None:
+                self.attribs[name] = value
+        return self
+
+
+class StreamingDrawing:
+    """
+    Drawing writing its elements to the output file as soon as they are added to the document,
+    instead of building the whole document tree and serializing it when saved
+
+    It mimics the subset of `svgwrite.Drawing` used by `MapRender`, and produces the same output,
+    but only keeps in memory the element being added (e.g. an area) at a time. Attributes are
+    validated against the SVG profile once per element template, that is, once for every element
+    name and set of attribute names, instead of on every attribute assignment
+    """
+    XML_HEADER = '<?xml version="1.0" encoding="utf-8" ?>\n'
+    NAMESPACES = {'xmlns': 'http://www.w3.org/2000/svg',
+                  'xmlns:ev': 'http://www.w3.org/2001/xml-events',
+                  'xmlns:xlink': 'http://www.w3.org/1999/xlink'}
+
+    def __init__(self, filename='noname.svg', size=('100%', '100%'), profile='full', **extra):
+        self.filename = filename
+        self.profile = profile
+        self.validator = get_validator(profile, debug=True)
+        self.validated_templates = set()
+        self.root = StreamElement('svg', {'baseProfile': profile, 'version': '1.1',
+                                          'width': size[0], 'height': size[1],
+                                          **self.NAMESPACES}, **extra)
+        self.defs = StreamElement('defs')
+        self.file = None
+
+    def g(self, **extra):
+        return StreamElement('g', **extra)
+
+    def rect(self, insert=(0, 0), size=(1, 1), rx=None, ry=None, **extra):
+        element = StreamElement('rect', {'x': insert[0], 'y': insert[1],
+                                         'width': size[0], 'height': size[1]}, **extra)
+        if rx is not None:
+            element['rx'] = rx
+        if ry is not None:
+            element['ry'] = ry
+        return element
+
+    def circle(self, center=(0, 0), r=1, **extra):
+        return StreamElement('circle', {'cx': center[0], 'cy': center[1], 'r': r}, **extra)
+
+    def line(self, start=(0, 0), end=(0, 0), **extra):
+        return StreamElement('line', {'x1': start[0], 'y1': start[1],
+                                      'x2': end[0], 'y2': end[1]}, **extra)
+
+    def polyline(self, points=(), **extra):
+        return StreamElement('polyline',
+                             {'points': ' '.join(f'{x},{y}' for x, y in points)}, **extra)
+
+    def polygon(self, points=(), **extra):
+        element = self.polyline(points, **extra)
+        element.name = 'polygon'
+        return element
+
+    def path(self, d=None, **extra):
+        return StreamElement('path', {'d': strlist([] if d is None else [d], ' ')}, **extra)
+
+    def symbol(self, **extra):
+        return StreamElement('symbol', **extra)
+
+    def use(self, href, insert=None, **extra):
+        element = StreamElement('use', {'xlink:href': href}, **extra)
+        if insert is not None:
+            element['x'] = insert[0]
+            element['y'] = insert[1]
+        return element
+
+    def text(self, text, insert=None, **extra):
+        attributes = {} if insert is None else {'x': str(insert[0]), 'y': str(insert[1])}
+        return StreamElement('text', attributes, text=str(text), **extra)
+
+    def add(self, element):
+        """
+        Write an element, together with all its children, to the output file
+        """
+        if self.file is None:
+            self._open()
+
+        parts = []
+        self._serialize(element, parts)
+        self.file.write(''.join(parts))
+        return element
+
+    def save(self):
+        """
+        Close the document and the output file
+
+        Definitions added once the document has been started are written at its end
+        """
+        if self.file is None:
+            self._open()
+
+        if self.defs.elements:
+            parts = []
+            self._serialize(self.defs, parts)
+            self.file.write(''.join(parts))
+
+        self.file.write('</svg>')
+        self.file.close()
+        self.file = None
+
+    def _open(self):
+        """
+        Open the output file, and write the start of the document to it, with the definitions
+        added so far
+        """
+        self.file = io.open(self.filename, mode='w', encoding='utf-8')
+        parts = [self.XML_HEADER]
+        self._write_start_tag(self.root, parts, validate=False)
+        parts.append('>')
+        self._serialize(self.defs, parts)
+        self.file.write(''.join(parts))
+        self.defs.elements.clear()
+
+    def _write_start_tag(self, element, parts, validate=True):
+        attributes = element.attribs
+        names = sorted(attributes)
+
+        template = (element.name, tuple(names))
+        if validate and template not in self.validated_templates:
+            self.validator.check_all_svg_attribute_values(element.name, attributes)
+            self.validated_templates.add(template)
+
+        parts.append(f'<{element.name}')
+        self._write_attributes(attributes, names, parts)
+
+    def _write_attributes(self, attributes, names, parts):
+        for name in names:
+            value = attributes[name]
+            if value is None:
+                continue
+            value = str(value)
+            if value:
+                parts.append(f' {name}="{_escape_attribute(value)}"')
+
+    def _serialize(self, element, parts):
+        self._write_start_tag(element, parts)
+        text = element.text or ''
+        if not text and not element.elements:
+            parts.append(' />')
+            return
+
+        parts.append('>')
+        parts.append(_escape_text(text))
+        for child in element.elements:
+            self._serialize(child, parts)
+        parts.append(f'</{element.name}>')
+
+
+class CompactDrawing(StreamingDrawing):
+    """
+    Streaming drawing producing smaller SVG files
+
+    - Presentation attributes (fill, stroke, fonts, ...) are replaced by a CSS class per distinct
+      combination of them, defined at a style sheet written at the end of the document
+    - Numbers of coordinates and transformations are rounded to `precision` decimals, and
+      coordinates equal to their default value of 0 are left out
+    - Empty groups are not written
+    """
+    PRESENTATION_ATTRIBUTES = {'fill', 'fill-opacity', 'fill-rule', 'stroke', 'stroke-width',
+                               'stroke-opacity', 'stroke-dasharray', 'stroke-linecap',
+                               'stroke-linejoin', 'stroke-miterlimit', 'opacity', 'font-family',
+                               'font-size', 'font-weight', 'text-anchor', 'alignment-baseline'}
+    # Properties whose plain numbers are user units as attributes, but need a unit in CSS
+    LENGTH_PROPERTIES = {'font-size', 'stroke-width'}
+    GEOMETRY_ATTRIBUTES = {'x', 'y', 'x1', 'y1', 'x2', 'y2', 'cx', 'cy', 'r', 'rx', 'ry', 'width',
+                           'height', 'points', 'transform', 'd'}
+    ZERO_DEFAULT_ATTRIBUTES = {'x', 'y', 'x1', 'y1', 'x2', 'y2', 'cx', 'cy'}
+    DECIMAL_NUMBER = re.compile(r'-?\d+\.\d*(?:[eE][-+]?\d+)?|-?\d+[eE][-+]?\d+')
+    PLAIN_NUMBER = re.compile(r'-?\d+(?:\.\d*)?')
+
+    def __init__(self, filename='noname.svg', size=('100%', '100%'), profile='full', precision=2,
+                 **extra):
+        super().__init__(filename, size, profile, **extra)
+        self.precision = precision
+        self.classes = {}
+
+    def _round_number(self, match):
+        number = f'{round(float(match.group()), self.precision):.{self.precision}f}'
+        if '.' in number:
+            number = number.rstrip('0').rstrip('.')
+        return '0' if number == '-0' else number
+
+    def _write_attributes(self, attributes, names, parts):
+        presentation = []
+        for name in names:
+            value = attributes[name]
+            if value is None:
+                continue
+            value = str(value)
+            if not value:
+                continue
+            if name in self.PRESENTATION_ATTRIBUTES:
+                presentation.append((name, value))
+                continue
+            if name in self.GEOMETRY_ATTRIBUTES:
+                value = self.DECIMAL_NUMBER.sub(self._round_number, value)
+                if value == '0' and name in self.ZERO_DEFAULT_ATTRIBUTES:
+                    continue
+            parts.append(f' {name}="{_escape_attribute(value)}"')
+
+        if presentation:
+            class_name = self.classes.setdefault(tuple(presentation), f's{len(self.classes)}')
+            parts.append(f' class="{class_name}"')
+
+    def _serialize(self, element, parts):
+        if element.name != 'g':
+            super()._serialize(element, parts)
+            return
+
+        children = []
+        for child in element.elements:
+            self._serialize(child, children)
+        if not children:
+            return
+
+        self._write_start_tag(element, parts)
+        parts.append('>')
+        parts.extend(children)
+        parts.append('</g>')
+
+    def save(self):
+        rules = []
+        for presentation, class_name in self.classes.items():
+            properties = ';'.join(f'{name}:{value}px' if name in self.LENGTH_PROPERTIES and
+                                  self.PLAIN_NUMBER.fullmatch(value) else f'{name}:{value}'
+                                  for name, value in presentation)
+            rules.append(f'.{class_name}{{{properties}}}')
+        if rules:
+            self.defs.add(StreamElement('style', {'type': 'text/css'}, text='\n'.join(rules)))
+        super().save()
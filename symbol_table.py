@@ -0,0 +1,114 @@
+import sys
+from array import array
+from collections import namedtuple
+
+from section import SymbolSection
+
+Symbol = namedtuple('Symbol', ['name', 'address', 'size', 'section', 'object'])
+
+
+class StringTable:
+    """
+    Compact append-only table of strings
+
+    Strings are stored back to back as UTF-8 in a single buffer and referred to by index. If
+    `intern` is set, adding a string that is already in the table returns its existing index, and
+    strings read from the table are interned, so that repeated strings are stored once
+    """
+    def __init__(self, intern=False):
+        self.intern = intern
+        self.blob = bytearray()
+        self.offsets = array('Q', [0])
+        self.indexes = {}
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getstate__(self):
+        # The indexes of interned strings are only needed to add strings, and are rebuilt then
+        return {**self.__dict__, 'indexes': None}
+
+    def add(self, string) -> int:
+        if self.intern:
+            if self.indexes is None:
+                self.indexes = {self.get(index): index for index in range(len(self))}
+            index = self.indexes.get(string)
+            if index is not None:
+                return index
+            index = self.indexes[string] = len(self)
+        else:
+            index = len(self)
+
+        self.blob += string.encode('utf8')
+        self.offsets.append(len(self.blob))
+        return index
+
+    def get(self, index) -> str:
+        string = self.blob[self.offsets[index]:self.offsets[index + 1]].decode('utf8')
+        return sys.intern(string) if self.intern else string
+
+
+class SymbolTable:
+    """
+    Columnar storage for the symbols of a map file
+
+    Each symbol is stored as one entry of each of the array-backed columns (address, size, and
+    indexes to its name, its parent input section and its contributing object file) instead of as
+    one Python object, so that maps with millions of symbols fit in memory
+    """
+    NO_OBJECT = 0xFFFFFFFF
+
+    def __init__(self):
+        self.addresses = array('Q')
+        self.sizes = array('Q')
+        self.name_indexes = array('I')
+        self.section_indexes = array('I')
+        self.object_indexes = array('I')
+        self.names = StringTable(intern=True)
+        self.section_names = StringTable(intern=True)
+        self.object_names = StringTable(intern=True)
+
+    def __len__(self):
+        return len(self.addresses)
+
+    def append(self, name, address, size, section, _object=None):
+        """
+        Add a symbol to the table
+
+        :param name: Name of the symbol
+        :param address: Address of the symbol
+        :param size: Size of the symbol, in bytes
+        :param section: Name of the input section containing the symbol
+        :param _object: Optional, object file contributing the input section
+        """
+        self.addresses.append(address)
+        self.sizes.append(size)
+        self.name_indexes.append(self.names.add(name))
+        self.section_indexes.append(self.section_names.add(section))
+        self.object_indexes.append(self.NO_OBJECT if _object is None
+                                   else self.object_names.add(_object))
+
+    def __getitem__(self, index) -> Symbol:
+        object_index = self.object_indexes[index]
+        return Symbol(name=self.names.get(self.name_indexes[index]),
+                      address=self.addresses[index],
+                      size=self.sizes[index],
+                      section=self.section_names.get(self.section_indexes[index]),
+                      object=None if object_index == self.NO_OBJECT
+                      else self.object_names.get(object_index))
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def iter_sections(self):
+        """
+        Get the symbols as sections of type `symbol`, whose parent is their input section
+        :return: Generator of `SymbolSection`
+        """
+        for symbol in self:
+            yield SymbolSection(address=symbol.address,
+                                size=symbol.size,
+                                id=symbol.name,
+                                parent=symbol.section,
+                                _object=symbol.object)
@@ -0,0 +1,159 @@
+import yaml
+from yaml.events import (AliasEvent, MappingEndEvent, MappingStartEvent, ScalarEvent,
+                         SequenceEndEvent, SequenceStartEvent)
+from yaml.nodes import ScalarNode
+
+# libyaml based loader, if PyYAML was built with it, pure Python one otherwise
+Loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+
+class YamlMapReader:
+    """
+    Read the elements of the `map` sequence of a yaml map file one at a time
+
+    Instead of loading the whole document, the reader walks the yaml event stream and only
+    constructs one `map` element at a time, so memory stays bounded no matter the number of
+    sections in the file. libyaml is used to produce the events when available
+    """
+    MAP_KEY = 'map'
+    MERGE_KEY = '<<'
+    MERGE_TAG = 'tag:yaml.org,2002:merge'
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.anchors = {}
+        self.keys = {}
+        self.loader = None
+        self.constructors = Loader.yaml_constructors
+
+    def __iter__(self):
+        with open(self.filename, 'rb') as file:
+            self.loader = Loader(file)
+            try:
+                yield from self._iter_map_elements()
+            finally:
+                self.loader.dispose()
+                self.loader = None
+                self.anchors = {}
+                self.keys = {}
+
+    def _iter_map_elements(self):
+        get_event = self.loader.get_event
+        # Stream and document start
+        get_event()
+        get_event()
+
+        event = get_event()
+        if not isinstance(event, MappingStartEvent):
+            raise KeyError(f"Map file {self.filename} must contain a '{self.MAP_KEY}' key")
+        self._register_anchor(event, None)
+
+        while True:
+            event = get_event()
+            if isinstance(event, MappingEndEvent):
+                raise KeyError(f"Map file {self.filename} must contain a '{self.MAP_KEY}' key")
+
+            if self._construct_key(event) != self.MAP_KEY:
+                self._skip_value(get_event())
+                continue
+
+            event = get_event()
+            if not isinstance(event, SequenceStartEvent):
+                raise TypeError(f"'{self.MAP_KEY}' at {self.filename} must be a list of sections")
+
+            while True:
+                event = get_event()
+                if isinstance(event, SequenceEndEvent):
+                    return
+                yield self._construct(event)
+
+    def _register_anchor(self, event, value):
+        if event.anchor is not None:
+            self.anchors[event.anchor] = value
+        return value
+
+    def _construct_key(self, event):
+        """
+        Construct a mapping key. Keys repeat for every element, so plain scalar keys are only
+        constructed once
+        :param event: First event of the key
+        :return: Constructed key
+        """
+        if isinstance(event, ScalarEvent) and event.tag is None and event.anchor is None:
+            key = self.keys.get(event.value)
+            if key is None:
+                key = self.keys[event.value] = self._construct(event)
+            return key
+        return self._construct(event)
+
+    def _construct(self, event):
+        """
+        Construct the value (scalar, sequence or mapping) starting at the given event, consuming
+        all of its events from the stream
+        :param event: First event of the value
+        :return: Constructed value
+        """
+        loader = self.loader
+
+        if isinstance(event, ScalarEvent):
+            tag = event.tag
+            if tag is None or tag == '!':
+                tag = loader.resolve(ScalarNode, event.value, event.implicit)
+            if tag == self.MERGE_TAG:
+                return self.MERGE_KEY
+            node = ScalarNode(tag, event.value, event.start_mark, event.end_mark, event.style)
+            constructor = self.constructors.get(tag, self.constructors[None])
+            return self._register_anchor(event, constructor(loader, node))
+
+        if isinstance(event, AliasEvent):
+            return self.anchors[event.anchor]
+
+        get_event = loader.get_event
+
+        if isinstance(event, SequenceStartEvent):
+            sequence = self._register_anchor(event, [])
+            while True:
+                event = get_event()
+                if isinstance(event, SequenceEndEvent):
+                    return sequence
+                sequence.append(self._construct(event))
+
+        mapping = self._register_anchor(event, {})
+        merged = {}
+        while True:
+            event = get_event()
+            if isinstance(event, MappingEndEvent):
+                break
+            key = self._construct_key(event)
+            value = self._construct(get_event())
+            if key == self.MERGE_KEY:
+                # Earlier mappings of a merge list take precedence over later ones
+                for merged_mapping in reversed(value) if isinstance(value, list) else [value]:
+                    merged.update(merged_mapping)
+            else:
+                mapping[key] = value
+
+        for key, value in merged.items():
+            mapping.setdefault(key, value)
+        return mapping
+
+    def _skip_value(self, event):
+        """
+        Skip the value starting at the given event without constructing it, unless it defines
+        anchors that later values might refer to
+        :param event: First event of the value
+        """
+        get_event = self.loader.get_event
+        depth = 0
+
+        while True:
+            if not isinstance(event, AliasEvent) and getattr(event, 'anchor', None) is not None:
+                self._construct(event)
+            elif isinstance(event, (SequenceStartEvent, MappingStartEvent)):
+                depth += 1
+            elif isinstance(event, (SequenceEndEvent, MappingEndEvent)):
+                depth -= 1
+
+            if depth == 0:
+                return
+            event = get_event()